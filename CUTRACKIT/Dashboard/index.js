@@ -32,6 +32,12 @@ async function populateGymDropdown() {
         option.textContent = court.name;
         gymSelect.appendChild(option);
     });
+
+    // Court posters link here with ?court_id=<id>: preselect that court
+    const posterCourt = new URLSearchParams(window.location.search).get('court_id');
+    if (posterCourt && data.some(court => String(court.id) === posterCourt)) {
+        gymSelect.value = posterCourt;
+    }
 }
 
 
@@ -0,0 +1,343 @@
+"""
+CourtFlow Admission Control
+
+Sits in front of /checkin and /checkout so a burst of players (e.g. the
+end of a league game) gets shed cheaply instead of piling up on the
+Courts row lock in check_in().
+
+Features:
+- Token-bucket rate limits per user and per court
+- Bounded concurrency queue per court with fast 429/503 rejection
+- Retry-After estimate based on queue depth and recent service time
+- In-memory pre-checks (already checked in, court known full) before any DB work
+- Queue depth and shed counters for monitoring
+"""
+
+from contextlib import contextmanager
+import math
+import os
+import threading
+import time
+
+# =====================================================
+# CONFIG
+# =====================================================
+# Per-user bucket: a player gets a few quick retries, then ~1 request / 2s
+USER_RATE = float(os.environ.get("ADMISSION_USER_RATE", "0.5"))
+USER_BURST = float(os.environ.get("ADMISSION_USER_BURST", "3"))
+
+# Per-court bucket: caps total check-in/check-out traffic aimed at one court
+COURT_RATE = float(os.environ.get("ADMISSION_COURT_RATE", "20"))
+COURT_BURST = float(os.environ.get("ADMISSION_COURT_BURST", "40"))
+
+# How many requests per court may hold a DB connection at once, how many may
+# wait behind them, and how long a waiter sticks around before being shed
+COURT_CONCURRENCY = int(os.environ.get("ADMISSION_COURT_CONCURRENCY", "2"))
+COURT_QUEUE_LIMIT = int(os.environ.get("ADMISSION_COURT_QUEUE_LIMIT", "20"))
+QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+
+# How long we trust "court is full" without asking the DB again (expiry
+# cleanup and other clients can free a slot behind our back)
+FULL_COURT_TTL = float(os.environ.get("ADMISSION_FULL_COURT_TTL", "5"))
+
+# How long we trust "already checked in" without asking the DB again. Kept
+# short: a check-out handled by another process (View/app.py, another
+# worker) or the 2 hour expiry can end the session behind our back, and the
+# pre-check only needs to absorb a burst of retries.
+CHECKED_IN_TTL = float(os.environ.get("ADMISSION_CHECKED_IN_TTL", "10"))
+
+# How long we remember which court a user is on, so /checkout can queue
+# behind that court. A stale entry only picks the wrong queue, never
+# rejects anything. Matches the 2 hour auto timeout in cleanup_expired_sessions().
+USER_COURT_TTL = 2 * 60 * 60
+
+# Idle buckets are dropped after this long so the dicts don't grow forever
+BUCKET_IDLE_SECONDS = 10 * 60
+
+
+# =====================================================
+# REJECTION
+# =====================================================
+# Raised whenever a request is turned away. The route turns it into a JSON
+# error with a Retry-After header.
+class Rejected(Exception):
+
+    def __init__(self, status, error, retry_after=None):
+        super().__init__(error)
+        self.status = status
+        self.error = error
+        self.retry_after = retry_after
+
+    def retry_after_header(self):
+        if self.retry_after is None:
+            return None
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+# =====================================================
+# TOKEN BUCKET
+# =====================================================
+class TokenBucket:
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    # Returns 0 if a token was taken, otherwise the seconds until one is free
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+    def idle(self, now):
+        return now - self.updated > BUCKET_IDLE_SECONDS
+
+
+# =====================================================
+# PER-COURT QUEUE
+# =====================================================
+class CourtQueue:
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        # court_slot() calls using this queue, guarded by _lock. A queue is
+        # only pruned at 0, so nobody can end up on a queue that was dropped.
+        self.holders = 0
+        # Moving average of how long one request holds its slot (seconds)
+        self.avg_service = 0.05
+
+    # Rough time until a new arrival would get a slot
+    def estimate_wait(self):
+        ahead = self.active + self.waiting
+        return ahead / COURT_CONCURRENCY * self.avg_service
+
+
+# =====================================================
+# SHARED STATE
+# =====================================================
+_lock = threading.Lock()
+_user_buckets = {}
+_court_buckets = {}
+_court_queues = {}
+_checked_in = {}       # user_id -> monotonic time the "already checked in" flag expires
+_user_courts = {}      # user_id -> (court_id, monotonic time it was recorded)
+_full_courts = {}      # court_id -> monotonic time the "full" flag expires
+_last_prune = time.monotonic()
+
+_counters = {
+    "admitted": 0,
+    "shed_user_rate": 0,
+    "shed_court_rate": 0,
+    "shed_queue_full": 0,
+    "shed_queue_timeout": 0,
+    "precheck_already_checked_in": 0,
+    "precheck_court_full": 0,
+}
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def _prune(now):
+    global _last_prune
+
+    if now - _last_prune < BUCKET_IDLE_SECONDS:
+        return
+    _last_prune = now
+
+    for buckets in (_user_buckets, _court_buckets):
+        for key in [k for k, b in buckets.items() if b.idle(now)]:
+            del buckets[key]
+
+    for key in [k for k, until in _checked_in.items() if until <= now]:
+        del _checked_in[key]
+
+    for key in [k for k, (_, at) in _user_courts.items() if now - at > USER_COURT_TTL]:
+        del _user_courts[key]
+
+    for key in [k for k, until in _full_courts.items() if until <= now]:
+        del _full_courts[key]
+
+    # Queues are created for any court id before the DB has checked it
+    # exists, so idle ones must go too
+    for key in [k for k, q in _court_queues.items() if q.holders == 0]:
+        del _court_queues[key]
+
+
+def _take(buckets, key, rate, burst, now):
+    bucket = buckets.get(key)
+    if bucket is None:
+        bucket = buckets[key] = TokenBucket(rate, burst, now)
+    return bucket.take(now)
+
+
+def _queue_for(court_id):
+    with _lock:
+        queue = _court_queues.get(court_id)
+        if queue is None:
+            queue = _court_queues[court_id] = CourtQueue()
+        queue.holders += 1
+        return queue
+
+
+def _release_queue(queue):
+    with _lock:
+        queue.holders -= 1
+
+
+# =====================================================
+# ADMISSION CHECKS (NO DB WORK)
+# =====================================================
+# admit() runs the cheap checks in order: user rate, in-memory pre-checks,
+# then court rate. A user who is spamming retries never spends a court token.
+def admit(user_id, court_id=None, checking_in=False):
+    now = time.monotonic()
+
+    with _lock:
+        _prune(now)
+
+        wait = _take(_user_buckets, user_id, USER_RATE, USER_BURST, now)
+        if wait:
+            _counters["shed_user_rate"] += 1
+            raise Rejected(429, "Too many requests, slow down", wait)
+
+        if checking_in:
+            checked_in_until = _checked_in.get(user_id)
+            if checked_in_until and checked_in_until > now:
+                _counters["precheck_already_checked_in"] += 1
+                raise Rejected(400, "Already checked in")
+
+            full_until = _full_courts.get(court_id)
+            if full_until and full_until > now:
+                _counters["precheck_court_full"] += 1
+                raise Rejected(403, "Court is full", full_until - now)
+
+        if court_id is not None:
+            wait = _take(_court_buckets, court_id, COURT_RATE, COURT_BURST, now)
+            if wait:
+                _counters["shed_court_rate"] += 1
+                raise Rejected(429, "Court is busy, try again shortly", wait)
+
+
+# Court a user is known to be on, so check-out can queue behind the right court
+def known_court(user_id):
+    with _lock:
+        known = _user_courts.get(user_id)
+        if known and time.monotonic() - known[1] < USER_COURT_TTL:
+            return known[0]
+        return None
+
+
+# =====================================================
+# BOUNDED CONCURRENCY PER COURT
+# =====================================================
+# Holds one of COURT_CONCURRENCY slots for the duration of the DB work.
+# Arrivals past COURT_QUEUE_LIMIT, or waiting longer than QUEUE_TIMEOUT,
+# get a 503 right away instead of adding to the lock pile-up.
+@contextmanager
+def court_slot(court_id):
+    queue = _queue_for(court_id)
+    try:
+        with queue.cond:
+            if queue.active >= COURT_CONCURRENCY or queue.waiting:
+                if queue.waiting >= COURT_QUEUE_LIMIT:
+                    _count("shed_queue_full")
+                    raise Rejected(503, "Court queue is full, try again shortly", queue.estimate_wait())
+
+                queue.waiting += 1
+                deadline = time.monotonic() + QUEUE_TIMEOUT
+                try:
+                    while queue.active >= COURT_CONCURRENCY:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            _count("shed_queue_timeout")
+                            raise Rejected(503, "Court queue timed out, try again shortly", queue.estimate_wait())
+                        queue.cond.wait(remaining)
+                finally:
+                    queue.waiting -= 1
+
+            queue.active += 1
+
+        _count("admitted")
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with queue.cond:
+                queue.active -= 1
+                queue.avg_service = 0.8 * queue.avg_service + 0.2 * elapsed
+                queue.cond.notify()
+
+    finally:
+        _release_queue(queue)
+
+
+# =====================================================
+# RECORD OUTCOMES (KEEPS PRE-CHECKS IN SYNC WITH THE DB)
+# =====================================================
+def record_check_in(user_id, court_id, court_full):
+    now = time.monotonic()
+    with _lock:
+        _checked_in[user_id] = now + CHECKED_IN_TTL
+        _user_courts[user_id] = (court_id, now)
+        if court_full:
+            _full_courts[court_id] = now + FULL_COURT_TTL
+
+
+def record_already_checked_in(user_id):
+    with _lock:
+        _checked_in[user_id] = time.monotonic() + CHECKED_IN_TTL
+
+
+def record_court_full(court_id):
+    with _lock:
+        _full_courts[court_id] = time.monotonic() + FULL_COURT_TTL
+
+
+def record_check_out(user_id, court_id=None):
+    with _lock:
+        _checked_in.pop(user_id, None)
+        _user_courts.pop(user_id, None)
+        if court_id is not None:
+            _full_courts.pop(court_id, None)
+
+
+# =====================================================
+# METRICS
+# =====================================================
+def stats():
+    now = time.monotonic()
+    with _lock:
+        queues = dict(_court_queues)
+        result = {
+            "counters": dict(_counters),
+            "shed_total": sum(v for k, v in _counters.items() if k.startswith(("shed_", "precheck_"))),
+            "known_checked_in": sum(1 for until in _checked_in.values() if until > now),
+            "known_full_courts": sorted(k for k, until in _full_courts.items() if until > now),
+        }
+
+    courts = {}
+    for court_id, queue in queues.items():
+        with queue.cond:
+            if queue.active or queue.waiting:
+                courts[str(court_id)] = {
+                    "active": queue.active,
+                    "waiting": queue.waiting,
+                    "avg_service_ms": round(queue.avg_service * 1000, 1),
+                }
+
+    result["queue_depth"] = sum(c["waiting"] for c in courts.values())
+    result["courts"] = courts
+    return result
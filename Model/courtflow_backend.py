@@ -8,16 +8,26 @@ Features:
 - Prevent race conditions
 - Auto timeout cleanup
 - Live player list
+- Admission control for check-in bursts (see admission_control.py)
+- Streaming CSV/JSON exports of Sessions and Stats (see exports.py)
+- Optional read replica with read-your-writes pinning and lag fallback
+- Short-TTL response cache for read routes (see response_cache.py)
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 from supabase import create_client
 import psycopg2 
 import psycopg2.extras
 import os
+import threading
+import time
 import jwt
+import admission_control
+import db_config
+import exports
+import response_cache
 
 # =====================================================
 # LOAD ENV VARIABLES
@@ -52,7 +62,17 @@ def get_profile():
     if not user_id:
         return jsonify({"error": "Unauthorized"}), 401
 
-    conn = get_db_connection()
+    body, status = response_cache.cached_json(
+        response_cache.profile_key(user_id),
+        response_cache.PROFILE_TTL,
+        lambda: load_profile(user_id)
+    )
+    return response_cache.json_response(body, status)
+
+# load_profile() returns (payload, status) for /profile on a cache miss
+def load_profile(user_id):
+
+    conn = get_read_connection(user_id)
     cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
     try:
@@ -65,13 +85,13 @@ def get_profile():
         profile = cursor.fetchone()
 
         if not profile:
-            return jsonify({"error": "Profile not found"}), 404
+            return {"error": "Profile not found"}, 404
 
-        return jsonify({
+        return {
             "fname": profile["fname"],
             "lname": profile["lname"],
             "email": profile["email"]
-        })
+        }, 200
 
     finally:
         cursor.close()
@@ -87,13 +107,7 @@ supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 # =====================================================
 # DATABASE CONNECTION (DIRECT POSTGRES)
 # =====================================================
-DB_CONFIG = {
-    "host": os.environ.get("DB_HOST"),
-    "database": os.environ.get("DB_NAME"),
-    "user": os.environ.get("DB_USER"),
-    "password": os.environ.get("DB_PASSWORD"),
-    "port": os.environ.get("DB_PORT")
-}
+DB_CONFIG = db_config.from_env()
 
 # get_db_connection() is a helper function to connect to the PostgreSQL database using psycopg2. It uses the DB_CONFIG dictionary for connection parameters and includes error handling to print any connection errors that occur.
 def get_db_connection():
@@ -103,10 +117,157 @@ def get_db_connection():
         print(f"Database connection error: {e}")
         raise
 
+# =====================================================
+# READ REPLICA (OPTIONAL)
+# =====================================================
+# Set REPLICA_DB_HOST to send read-only routes to a streaming replica so they
+# stay off the primary that holds check_in()'s row locks. Anything missing
+# from the REPLICA_DB_* settings falls back to the primary's value.
+REPLICA_DB_CONFIG = db_config.from_env("REPLICA_DB", defaults=DB_CONFIG)
+# A replica that stops answering must fail fast so reads fall back to the
+# primary instead of hanging until the OS TCP timeout
+REPLICA_DB_CONFIG["connect_timeout"] = int(os.environ.get("REPLICA_CONNECT_TIMEOUT", "2"))
+REPLICA_ENABLED = bool(os.environ.get("REPLICA_DB_HOST"))
+
+# After a user's own check-in/check-out, their reads go to the primary for
+# this long so they always see their own write
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Reads fall back to the primary while the replica is further behind than
+# this. Lag is re-measured at most every REPLICA_LAG_CHECK_SECONDS.
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "2"))
+REPLICA_LAG_CHECK_SECONDS = float(os.environ.get("REPLICA_LAG_CHECK_SECONDS", "5"))
+
+_replica_lock = threading.Lock()
+_pinned_keys = {}     # user_id or ("court", id) -> monotonic time the pin expires
+_replica_state = {
+    "healthy": True,
+    "lag_seconds": None,
+    "checked_at": None,
+    "replica_reads": 0,
+    "primary_reads": 0,
+    "pinned_reads": 0,
+    "fallbacks": 0,
+}
+
+# Called after a successful write. pin_key is the user_id who wrote, or
+# ("court", court_id) so the cache refill after a write isn't read from a
+# replica that hasn't caught up yet.
+def pin_to_primary(pin_key):
+    now = time.monotonic()
+    with _replica_lock:
+        if len(_pinned_keys) > 10000:
+            for key in [k for k, until in _pinned_keys.items() if until <= now]:
+                del _pinned_keys[key]
+        _pinned_keys[pin_key] = now + READ_YOUR_WRITES_SECONDS
+
+# Returns the replica's lag in seconds, or None when it can't be trusted.
+#
+# "Replayed everything it received" only means caught up while the WAL
+# receiver is actually streaming from the primary. If replication breaks,
+# receive and replay LSNs stay equal forever while the data goes stale, so
+# a missing or non-streaming receiver counts as unhealthy. Reading
+# pg_stat_wal_receiver.status needs superuser or pg_read_all_stats on the
+# replica; without it status is NULL and the replica is never used.
+#
+# A server that isn't in recovery isn't replicating from anything (e.g. a
+# plain second Postgres in tests, or REPLICA_DB_HOST pointed at the primary)
+# and counts as lag 0.
+def measure_replica_lag(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT pg_is_in_recovery(),
+                   (SELECT status FROM pg_stat_wal_receiver),
+                   CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                   ELSE EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp())
+                   END;
+        """)
+        return replica_lag_from_status(*cursor.fetchone())
+    finally:
+        cursor.close()
+        conn.rollback()
+
+def replica_lag_from_status(in_recovery, receiver_status, replay_lag):
+    if not in_recovery:
+        return 0.0
+    if receiver_status != "streaming":
+        print(f"Replica WAL receiver is {receiver_status or 'not running'}")
+        return None
+    if replay_lag is None:
+        return None
+    return float(replay_lag)
+
+def _read_from_primary(counter):
+    with _replica_lock:
+        _replica_state[counter] += 1
+    return get_db_connection()
+
+# get_read_connection() is get_db_connection() for read-only routes. It
+# returns a replica connection when one is configured, healthy and caught up,
+# and the primary otherwise. Never write through the returned connection.
+def get_read_connection(pin_key=None):
+
+    if not REPLICA_ENABLED:
+        return get_db_connection()
+
+    now = time.monotonic()
+
+    with _replica_lock:
+        pinned_until = _pinned_keys.get(pin_key)
+        checked_at = _replica_state["checked_at"]
+        check_due = checked_at is None or now - checked_at >= REPLICA_LAG_CHECK_SECONDS
+        healthy = _replica_state["healthy"]
+        if check_due:
+            # Claim the check so concurrent requests don't all measure lag
+            _replica_state["checked_at"] = now
+
+    if pinned_until and pinned_until > now:
+        return _read_from_primary("pinned_reads")
+
+    if not healthy and not check_due:
+        return _read_from_primary("fallbacks")
+
+    try:
+        conn = psycopg2.connect(**REPLICA_DB_CONFIG)
+    except Exception as e:
+        print(f"Replica connection error: {e}")
+        with _replica_lock:
+            _replica_state["healthy"] = False
+            _replica_state["checked_at"] = now
+        return _read_from_primary("fallbacks")
+
+    if check_due:
+        try:
+            lag = measure_replica_lag(conn)
+        except Exception as e:
+            print(f"Replica lag check error: {e}")
+            lag = None
+
+        healthy = lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+        with _replica_lock:
+            _replica_state["lag_seconds"] = lag
+            _replica_state["healthy"] = healthy
+        if not healthy:
+            print(f"Replica lag {lag}s over {REPLICA_MAX_LAG_SECONDS}s, reading from primary")
+
+    if not healthy:
+        conn.close()
+        return _read_from_primary("fallbacks")
+
+    with _replica_lock:
+        _replica_state["replica_reads"] += 1
+    return conn
+
 
 # =====================================================
 # HELPER: GET PROFILE ID FROM SUPABASE TOKEN
 # =====================================================
+# auth_id -> Profiles.id never changes once a profile exists, so successful
+# lookups are remembered. This keeps rejected check-in bursts off the DB.
+PROFILE_ID_CACHE_SIZE = 10000
+_profile_id_cache = {}
+
 def get_profile_id_from_token():
 
     auth_header = request.headers.get("Authorization")
@@ -129,6 +290,9 @@ def get_profile_id_from_token():
         if not auth_uuid:
             return None
 
+        if auth_uuid in _profile_id_cache:
+            return _profile_id_cache[auth_uuid]
+
         conn = get_db_connection()
         cursor = conn.cursor()
 
@@ -145,22 +309,65 @@ def get_profile_id_from_token():
         if not result:
             return None
 
+        if len(_profile_id_cache) >= PROFILE_ID_CACHE_SIZE:
+            _profile_id_cache.clear()
+        _profile_id_cache[auth_uuid] = result[0]
+
         return result[0]
 
     except Exception as e:
         print(f"JWT decoding error: {e}")
         return None
 
+# Comma-separated Profiles ids allowed to use the operator routes: exports
+# (every player's history) and the replica / cache / admission status pages.
+# With none configured, nobody can.
+OPERATOR_IDS = {
+    int(i) for i in os.environ.get("OPERATOR_IDS", "").split(",") if i.strip()
+}
+
+# Error response for callers who aren't operators, None for operators
+def operator_rejected():
+    user_id = get_profile_id_from_token()
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+    if user_id not in OPERATOR_IDS:
+        return jsonify({"error": "Operators only"}), 403
+    return None
+
+# =====================================================
+# HELPER: ADMISSION CONTROL REJECTIONS
+# =====================================================
+# Turns an admission_control.Rejected into the JSON error response, adding a
+# Retry-After header so clients back off instead of hammering the route.
+def admission_rejected(rejection):
+    response = jsonify({"error": rejection.error})
+    response.status_code = rejection.status
+    retry_after = rejection.retry_after_header()
+    if retry_after:
+        response.headers["Retry-After"] = retry_after
+    return response
+
 # =====================================================
 # AUTO CLEANUP (2 HOUR TIMEOUT)
 # =====================================================
+# Returns (user_id, court_id) for every session it closed so the caller can
+# invalidate caches once the UPDATE is committed.
 def cleanup_expired_sessions(cursor):
     cursor.execute("""
         UPDATE "Sessions"
         SET check_out_at = NOW()
         WHERE check_out_at IS NULL
-        AND check_in_at < NOW() - INTERVAL '2 hours';
+        AND check_in_at < NOW() - INTERVAL '2 hours'
+        RETURNING user_id, court_id;
     """)
+    return [(row[0], row[1]) for row in cursor.fetchall()]
+
+def expired_sessions_committed(expired):
+    for user_id, court_id in expired:
+        admission_control.record_check_out(user_id, court_id)
+    for court_id in {court_id for _, court_id in expired}:
+        response_cache.invalidate_court(court_id)
 
 # =====================================================
 # CHECK-IN
@@ -178,6 +385,23 @@ def check_in():
     if not court_id:
         return jsonify({"error": "court_id required"}), 400
 
+    try:
+        court_id = int(court_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "court_id must be an integer"}), 400
+
+    # Shed bursts before they reach the Courts row lock
+    try:
+        admission_control.admit(user_id, court_id, checking_in=True)
+        with admission_control.court_slot(court_id):
+            return check_in_transaction(user_id, court_id)
+    except admission_control.Rejected as rejection:
+        return admission_rejected(rejection)
+
+# check_in_transaction() does the actual DB work for /checkin once the request
+# has been admitted, and feeds the outcome back into the admission pre-checks.
+def check_in_transaction(user_id, court_id):
+
     conn = get_db_connection()
     cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
@@ -185,18 +409,9 @@ def check_in():
         conn.autocommit = False
 
         # Cleanup old sessions
-        cleanup_expired_sessions(cursor)
+        expired = cleanup_expired_sessions(cursor)
         conn.commit()
-
-        # Prevent double check-in
-        cursor.execute("""
-            SELECT 1 FROM "Sessions"
-            WHERE user_id = %s
-            AND check_out_at IS NULL;
-        """, (user_id,))
-        if cursor.fetchone():
-            conn.rollback()
-            return jsonify({"error": "Already checked in"}), 400
+        expired_sessions_committed(expired)
 
         # Lock court row
         cursor.execute("""
@@ -212,23 +427,33 @@ def check_in():
 
         max_capacity = court["max_capacity"]
 
-        # Count active players
+        # Insert session. The sessions_one_open_per_user unique index
+        # (migrations/0001) prevents double check-in, even under races.
+        cursor.execute("""
+            INSERT INTO "Sessions" (user_id, court_id)
+            VALUES (%s, %s)
+            ON CONFLICT (user_id) WHERE check_out_at IS NULL DO NOTHING
+            RETURNING id;
+        """, (user_id, court_id))
+        if not cursor.fetchone():
+            conn.rollback()
+            admission_control.record_already_checked_in(user_id)
+            return jsonify({"error": "Already checked in"}), 400
+
+        # Count active players, including the session we just inserted. The
+        # court row lock keeps this count stable until we commit.
         cursor.execute("""
             SELECT COUNT(*) FROM "Sessions"
             WHERE court_id = %s
             AND check_out_at IS NULL;
         """, (court_id,))
-        current_players = cursor.fetchone()[0]
+        current_players = cursor.fetchone()[0] - 1
 
         if current_players >= max_capacity:
+            conn.rollback()
+            admission_control.record_court_full(court_id)
             return jsonify({"error": "Court is full"}), 403
 
-        # Insert session
-        cursor.execute("""
-            INSERT INTO "Sessions" (user_id, court_id)
-            VALUES (%s, %s);
-        """, (user_id, court_id))
-
         new_count = current_players + 1
         status = "Full" if new_count >= max_capacity else "Open"
 
@@ -239,6 +464,10 @@ def check_in():
         """, (status, court_id))
 
         conn.commit()
+        admission_control.record_check_in(user_id, court_id, status == "Full")
+        pin_to_primary(user_id)
+        pin_to_primary(("court", court_id))
+        response_cache.invalidate_court(court_id)
 
         return jsonify({
             "message": "Checked in successfully",
@@ -265,6 +494,21 @@ def check_out():
     if not user_id:
         return jsonify({"error": "Unauthorized"}), 401
 
+    # Only queue behind a court when we know which one the user is on
+    court_id = admission_control.known_court(user_id)
+
+    try:
+        admission_control.admit(user_id, court_id)
+        if court_id is None:
+            return check_out_transaction(user_id)
+        with admission_control.court_slot(court_id):
+            return check_out_transaction(user_id)
+    except admission_control.Rejected as rejection:
+        return admission_rejected(rejection)
+
+# check_out_transaction() does the DB work for /checkout once admitted.
+def check_out_transaction(user_id):
+
     conn = get_db_connection()
     cursor = conn.cursor()
 
@@ -281,6 +525,7 @@ def check_out():
 
         result = cursor.fetchone()
         if not result:
+            admission_control.record_check_out(user_id)
             return jsonify({"error": "No active session"}), 404
 
         court_id = result[0]
@@ -308,6 +553,10 @@ def check_out():
         """, (status, court_id))
 
         conn.commit()
+        admission_control.record_check_out(user_id, court_id)
+        pin_to_primary(user_id)
+        pin_to_primary(("court", court_id))
+        response_cache.invalidate_court(court_id)
 
         return jsonify({"message": "Checked out successfully"})
 
@@ -325,12 +574,20 @@ def check_out():
 @app.route("/court/<int:court_id>", methods=["GET"])
 def get_court_status(court_id):
 
-    conn = get_db_connection()
+    body, status = response_cache.cached_json(
+        response_cache.court_key(court_id),
+        response_cache.COURT_TTL,
+        lambda: load_court_status(court_id)
+    )
+    return response_cache.json_response(body, status)
+
+# load_court_status() returns (payload, status) for /court/<id> on a cache miss
+def load_court_status(court_id):
+
+    conn = get_read_connection(("court", court_id))
     cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
     try:
-        cleanup_expired_sessions(cursor)
-
         cursor.execute("""
             SELECT name, max_capacity, status
             FROM "Courts"
@@ -339,18 +596,19 @@ def get_court_status(court_id):
         court = cursor.fetchone()
 
         if not court:
-            return jsonify({"error": "Court not found"}), 404
+            return {"error": "Court not found"}, 404
 
         cursor.execute("""
             SELECT p.fname, p.lname
             FROM "Sessions" s
             JOIN "Profiles" p ON s.user_id = p.id
             WHERE s.court_id = %s
-            AND s.check_out_at IS NULL;
+            AND s.check_out_at IS NULL
+            AND s.check_in_at >= NOW() - INTERVAL '2 hours';
         """, (court_id,))
         players = cursor.fetchall()
 
-        return jsonify({
+        return {
             "court_name": court["name"],
             "status": court["status"],
             "max_capacity": court["max_capacity"],
@@ -359,11 +617,106 @@ def get_court_status(court_id):
                 {"fname": p["fname"], "lname": p["lname"]}
                 for p in players
             ]
-        })
+        }, 200
 
     finally:
         cursor.close()
         conn.close()
 
+# =====================================================
+# EXPORTS (SESSIONS / STATS)
+# =====================================================
+# Streams every matching row as CSV (default) or JSON.
+# Query params: start, end (ISO 8601), court_id, format=csv|json, gzip=1
+# Operators only (OPERATOR_IDS)
+@app.route("/export/sessions", methods=["GET"])
+def export_sessions():
+    return export_response(exports.SESSIONS_EXPORT)
+
+@app.route("/export/stats", methods=["GET"])
+def export_stats():
+    return export_response(exports.STATS_EXPORT)
+
+def export_response(export):
+
+    rejected = operator_rejected()
+    if rejected:
+        return rejected
+
+    fmt = request.args.get("format", "csv")
+    if fmt not in exports.FORMATS:
+        return jsonify({"error": "format must be csv or json"}), 400
+
+    try:
+        params = exports.parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    compress = request.args.get("gzip") in ("1", "true")
+
+    # Exports stay on the primary: a minutes-long snapshot on a hot standby
+    # gets cancelled once replay conflicts with it (max_standby_streaming_delay)
+    conn = get_db_connection()
+    try:
+        conn.autocommit = False
+        cursor = exports.open_export_cursor(conn, export, params)
+    except Exception as e:
+        conn.close()
+        return jsonify({"error": str(e)}), 500
+
+    filename = f"{export['filename']}.{fmt}"
+    mimetype = exports.FORMATS[fmt]
+    if compress:
+        filename += ".gz"
+        mimetype = "application/gzip"
+
+    # The generator owns conn/cursor from here on and closes them when done
+    return Response(
+        exports.stream_export(conn, cursor, export, fmt, compress),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# =====================================================
+# READ REPLICA STATUS
+# =====================================================
+@app.route("/replica/status", methods=["GET"])
+def get_replica_status():
+    rejected = operator_rejected()
+    if rejected:
+        return rejected
+
+    with _replica_lock:
+        state = dict(_replica_state)
+        pinned = sum(1 for until in _pinned_keys.values() if until > time.monotonic())
+    state.pop("checked_at")
+    state["enabled"] = REPLICA_ENABLED
+    state["max_lag_seconds"] = REPLICA_MAX_LAG_SECONDS
+    state["pinned"] = pinned
+    return jsonify(state)
+
+# =====================================================
+# RESPONSE CACHE STATS
+# =====================================================
+@app.route("/cache/stats", methods=["GET"])
+def get_cache_stats():
+    rejected = operator_rejected()
+    if rejected:
+        return rejected
+
+    return jsonify(response_cache.stats())
+
+# =====================================================
+# ADMISSION CONTROL STATS
+# =====================================================
+# Queue depth per court and how many requests each check has shed.
+@app.route("/admission/stats", methods=["GET"])
+def get_admission_stats():
+    rejected = operator_rejected()
+    if rejected:
+        return rejected
+
+    return jsonify(admission_control.stats())
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+CourtFlow database settings
+
+Turns the DB_* environment variables (or Model/.env) into psycopg2.connect()
+arguments for the backend and every script that talks to Postgres directly,
+so a new connection setting only has to be added here.
+"""
+
+from dotenv import load_dotenv
+import os
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+
+# psycopg2.connect() argument -> environment variable suffix
+SETTINGS = [
+    ("host", "HOST"),
+    ("database", "NAME"),
+    ("user", "USER"),
+    ("password", "PASSWORD"),
+    ("port", "PORT"),
+]
+
+
+# Reads <prefix>_HOST, <prefix>_NAME, ... Anything unset falls back to
+# defaults (e.g. the replica falls back to the primary's settings).
+def from_env(prefix="DB", defaults=None):
+    defaults = defaults or {}
+    return {
+        key: os.environ.get(f"{prefix}_{suffix}", defaults.get(key))
+        for key, suffix in SETTINGS
+    }
+
+
+DB_CONFIG = from_env()
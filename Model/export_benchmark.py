@@ -0,0 +1,116 @@
+"""
+Export benchmark
+
+Measures rows/sec and peak RSS of the streaming exports in exports.py
+against the Postgres database configured in .env (DB_HOST, DB_NAME, ...).
+
+Usage (from the Model folder):
+    python export_benchmark.py --seed 5000000     # local DB only: adds fake rows
+    python export_benchmark.py --export sessions --format csv --gzip
+
+--seed inserts synthetic Courts, Profiles and Sessions rows. Never point it
+at the real Supabase database.
+"""
+
+import argparse
+import resource
+import sys
+import time
+import psycopg2
+from db_config import DB_CONFIG
+import exports
+
+
+# Peak resident set size of this process in MB (ru_maxrss is KB on Linux,
+# bytes on macOS)
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def seed(conn, rows):
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        INSERT INTO "Courts" (name, max_capacity, status)
+        SELECT 'Bench Court ' || g, 10, 'Open'
+        FROM generate_series(1, 20) g
+        RETURNING id;
+    """)
+    court_ids = [r[0] for r in cursor.fetchall()]
+
+    cursor.execute("""
+        INSERT INTO "Profiles" (fname, lname)
+        SELECT 'Bench', 'Player ' || g
+        FROM generate_series(1, 10000) g
+        RETURNING id;
+    """)
+    profile_ids = [r[0] for r in cursor.fetchall()]
+
+    # Spread sessions over the last year, all checked out
+    cursor.execute("""
+        INSERT INTO "Sessions" (user_id, court_id, check_in_at, check_out_at)
+        SELECT (%(profiles)s::bigint[])[1 + g %% array_length(%(profiles)s::bigint[], 1)],
+               (%(courts)s::bigint[])[1 + g %% array_length(%(courts)s::bigint[], 1)],
+               NOW() - (g %% 525600) * INTERVAL '1 minute',
+               NOW() - (g %% 525600) * INTERVAL '1 minute' + INTERVAL '1 hour'
+        FROM generate_series(1, %(rows)s) g;
+    """, {"profiles": profile_ids, "courts": court_ids, "rows": rows})
+
+    conn.commit()
+    cursor.execute('ANALYZE "Sessions";')
+    conn.commit()
+    cursor.close()
+
+
+def run(conn, export, fmt, compress, params):
+    conn.autocommit = False
+    cursor = exports.open_export_cursor(conn, export, params)
+
+    started = time.monotonic()
+    total_bytes = 0
+    for chunk in exports.stream_export(conn, cursor, export, fmt, compress):
+        total_bytes += len(chunk)
+    elapsed = time.monotonic() - started
+
+    return total_bytes, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CourtFlow streaming exports")
+    parser.add_argument("--seed", type=int, default=0, help="insert this many fake Sessions first")
+    parser.add_argument("--export", choices=sorted(exports.EXPORTS), default="sessions")
+    parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--court-id")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    args = parser.parse_args()
+
+    if args.seed:
+        conn = psycopg2.connect(**DB_CONFIG)
+        print(f"Seeding {args.seed} sessions...")
+        seed(conn, args.seed)
+        conn.close()
+
+    params = exports.parse_filters({
+        "start": args.start,
+        "end": args.end,
+        "court_id": args.court_id,
+    })
+
+    export = exports.EXPORTS[args.export]
+    rss_before = peak_rss_mb()
+
+    # stream_export() closes the connection and prints rows/sec when done
+    conn = psycopg2.connect(**DB_CONFIG)
+    total_bytes, elapsed = run(conn, export, args.format, args.gzip, params)
+
+    print(f"Output: {total_bytes / (1024 * 1024):.1f} MB in {elapsed:.1f}s")
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB (before export: {rss_before:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
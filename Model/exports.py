@@ -0,0 +1,220 @@
+"""
+CourtFlow Exports
+
+Streams Sessions and Stats out of Postgres as CSV or JSON for billing and
+audits. Rows are pulled through a server-side (named) cursor in batches
+and encoded chunk by chunk, so memory stays flat no matter how many rows
+the export covers.
+
+Features:
+- Server-side cursor, EXPORT_BATCH_SIZE rows per round trip
+- CSV or JSON array output
+- Date range and court filters
+- Optional gzip
+"""
+
+from datetime import date, datetime
+import csv
+import io
+import json
+import os
+import time
+import zlib
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "5000"))
+
+# Rows encoded per chunk handed to the WSGI server
+EXPORT_CHUNK_ROWS = 1000
+
+# =====================================================
+# EXPORT QUERIES
+# =====================================================
+# Filters are optional: a NULL parameter disables that filter. psycopg2
+# interpolates parameters client side, so the planner sees the literal
+# NULLs and drops the unused conditions.
+SESSIONS_EXPORT = {
+    "filename": "sessions",
+    "columns": [
+        "session_id", "user_id", "fname", "lname",
+        "court_id", "court_name", "check_in_at", "check_out_at",
+    ],
+    "sql": """
+        SELECT s.id, s.user_id, p.fname, p.lname,
+               s.court_id, c.name, s.check_in_at, s.check_out_at
+        FROM "Sessions" s
+        LEFT JOIN "Profiles" p ON p.id = s.user_id
+        LEFT JOIN "Courts" c ON c.id = s.court_id
+        WHERE (%(start)s::timestamptz IS NULL OR s.check_in_at >= %(start)s)
+        AND (%(end)s::timestamptz IS NULL OR s.check_in_at < %(end)s)
+        AND (%(court_id)s::bigint IS NULL OR s.court_id = %(court_id)s)
+        ORDER BY s.id;
+    """,
+}
+
+STATS_EXPORT = {
+    "filename": "stats",
+    "columns": [
+        "stat_id", "user_id", "fname", "lname", "action_type", "points",
+        "session_id", "court_id", "court_name", "created_at",
+    ],
+    "sql": """
+        SELECT st.id, st.user_id, p.fname, p.lname, st.action_type, st.points,
+               st.session_id, s.court_id, c.name, st.created_at
+        FROM "Stats" st
+        LEFT JOIN "Profiles" p ON p.id = st.user_id
+        LEFT JOIN "Sessions" s ON s.id = st.session_id
+        LEFT JOIN "Courts" c ON c.id = s.court_id
+        WHERE (%(start)s::timestamptz IS NULL OR st.created_at >= %(start)s)
+        AND (%(end)s::timestamptz IS NULL OR st.created_at < %(end)s)
+        AND (%(court_id)s::bigint IS NULL OR s.court_id = %(court_id)s)
+        ORDER BY st.id;
+    """,
+}
+
+EXPORTS = {
+    "sessions": SESSIONS_EXPORT,
+    "stats": STATS_EXPORT,
+}
+
+FORMATS = {
+    "csv": "text/csv",
+    "json": "application/json",
+}
+
+
+# =====================================================
+# FILTER PARSING
+# =====================================================
+# Turns ?start=&end=&court_id= into query parameters. Dates are ISO 8601
+# (e.g. 2026-03-01 or 2026-03-01T18:00:00+00:00). Raises ValueError with a
+# message suitable for a 400 response.
+def parse_filters(args):
+    params = {"start": None, "end": None, "court_id": None}
+
+    for key in ("start", "end"):
+        value = args.get(key)
+        if value:
+            try:
+                params[key] = datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"{key} must be an ISO 8601 date")
+
+    court_id = args.get("court_id")
+    if court_id:
+        try:
+            params["court_id"] = int(court_id)
+        except ValueError:
+            raise ValueError("court_id must be an integer")
+
+    return params
+
+
+# =====================================================
+# CURSOR
+# =====================================================
+# Declares the server-side cursor up front so query errors surface before
+# the response starts streaming. The connection must not be autocommit:
+# named cursors only live inside a transaction.
+def open_export_cursor(conn, export, params):
+    cursor = conn.cursor(name=f"export_{export['filename']}")
+    cursor.itersize = EXPORT_BATCH_SIZE
+    cursor.execute(export["sql"], params)
+    return cursor
+
+
+# =====================================================
+# ENCODERS
+# =====================================================
+def _cell(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_cell(v) for v in row])
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def encode_json(columns, rows):
+    parts = ["["]
+    separator = "\n"
+
+    for count, row in enumerate(rows, 1):
+        record = {c: _cell(v) for c, v in zip(columns, row)}
+        parts.append(separator + json.dumps(record))
+        separator = ",\n"
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+
+    parts.append("\n]\n")
+    yield "".join(parts).encode("utf-8")
+
+
+ENCODERS = {
+    "csv": encode_csv,
+    "json": encode_json,
+}
+
+
+def gzip_chunks(chunks):
+    # wbits=31 writes a gzip header/trailer instead of a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+# =====================================================
+# STREAM
+# =====================================================
+# Generator handed to the Flask Response. Owns the cursor and connection and
+# closes both when the export finishes or the client disconnects.
+#
+# An error after the first chunk can't change the 200 that's already sent.
+# Instead of ending the file cleanly, the export writes a failure line (not
+# valid CSV data or JSON) and re-raises, so the WSGI server aborts the
+# chunked response and the client sees an incomplete transfer. A gzip
+# export just stops: the missing gzip trailer makes gunzip fail.
+def stream_export(conn, cursor, export, fmt, compress):
+    started = time.monotonic()
+    rows = 0
+
+    def counted(source):
+        nonlocal rows
+        for row in source:
+            rows += 1
+            yield row
+
+    try:
+        chunks = ENCODERS[fmt](export["columns"], counted(cursor))
+        if compress:
+            chunks = gzip_chunks(chunks)
+        yield from chunks
+
+    except Exception as e:
+        print(f"Export {export['filename']} failed after {rows} rows: {e}")
+        if not compress:
+            yield f"\n# EXPORT FAILED after {rows} rows: incomplete file\n".encode("utf-8")
+        raise
+
+    finally:
+        elapsed = time.monotonic() - started
+        print(f"Export {export['filename']}: {rows} rows in {elapsed:.1f}s "
+              f"({rows / elapsed if elapsed else 0:.0f} rows/sec)")
+        cursor.close()
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,173 @@
+"""
+CourtFlow migrations
+
+Applies the numbered SQL files in migrations/ in order and records each one
+in a schema_migrations table so it only ever runs once.
+
+Usage (from the Model folder):
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied / pending
+
+Statements run one at a time in autocommit mode, because CREATE INDEX
+CONCURRENTLY (used so index builds don't block check-ins) can't run inside
+a transaction. A concurrent build that fails (e.g. a duplicate open session
+slipped in while building a unique index) leaves an INVALID index behind,
+which IF NOT EXISTS would then skip and ON CONFLICT can't use. Such indexes
+are dropped, the migration stops without being recorded, and the next run
+builds them again. Migrations must be safe to re-run (IF NOT EXISTS,
+idempotent UPDATEs): one recorded with an INVALID index is applied again.
+"""
+
+import argparse
+import os
+import re
+import psycopg2
+from db_config import DB_CONFIG
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def list_migrations():
+    return sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+
+
+# Splits a migration file into statements. Statements end with ";" at the end
+# of a line; "--" comment lines are dropped. Good enough for our migrations,
+# which contain no functions or dollar-quoted bodies.
+def split_statements(sql):
+    statements = []
+    current = []
+
+    for line in sql.splitlines():
+        if line.strip().startswith("--"):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statement = "\n".join(current).strip()
+            if statement != ";":
+                statements.append(statement)
+            current = []
+
+    leftover = "\n".join(current).strip()
+    if leftover:
+        statements.append(leftover)
+
+    return statements
+
+
+CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)",
+    re.IGNORECASE
+)
+
+
+# True / False for a valid / INVALID index, None if it doesn't exist
+def index_is_valid(cursor, name):
+    cursor.execute("""
+        SELECT i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s
+        AND pg_table_is_visible(c.oid);
+    """, (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def drop_if_invalid(cursor, name):
+    if index_is_valid(cursor, name) is False:
+        print(f"  dropping INVALID index {name} left by a failed build")
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}";')
+        return True
+    return False
+
+
+def run_statement(cursor, statement):
+    match = CONCURRENT_INDEX.search(statement)
+    if not match:
+        cursor.execute(statement)
+        return
+
+    name = match.group(1)
+    # A leftover from an earlier failed build would make IF NOT EXISTS a no-op
+    drop_if_invalid(cursor, name)
+
+    try:
+        cursor.execute(statement)
+    except psycopg2.Error:
+        drop_if_invalid(cursor, name)
+        raise
+
+    if drop_if_invalid(cursor, name):
+        raise RuntimeError(f"index {name} was built INVALID")
+
+
+def invalid_indexes(cursor, statements):
+    names = [m.group(1) for m in map(CONCURRENT_INDEX.search, statements) if m]
+    return [name for name in names if index_is_valid(cursor, name) is False]
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version text PRIMARY KEY,
+            applied_at timestamp with time zone DEFAULT now()
+        );
+    """)
+    cursor.execute("SELECT version FROM schema_migrations;")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(conn, status_only=False):
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    try:
+        applied = applied_versions(cursor)
+
+        for filename in list_migrations():
+            version = filename[:-len(".sql")]
+            with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+                statements = split_statements(f.read())
+
+            # Recorded by an older migrate.py that didn't check its index
+            # builds: re-apply (migrations are safe to re-run)
+            broken = version in applied and invalid_indexes(cursor, statements)
+
+            if version in applied and not broken:
+                if status_only:
+                    print(f"  applied  {version}")
+                continue
+
+            if status_only:
+                state = "INVALID" if broken else "pending"
+                print(f"  {state:<7}  {version}")
+                continue
+
+            print(f"{'Re-applying' if broken else 'Applying'} {version}...")
+            for statement in statements:
+                run_statement(cursor, statement)
+
+            cursor.execute("""
+                INSERT INTO schema_migrations (version) VALUES (%s)
+                ON CONFLICT (version) DO NOTHING;
+            """, (version,))
+
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply CourtFlow schema migrations")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        migrate(conn, status_only=args.status)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+-- One open session per user, enforced by the database.
+-- check_in() relies on this index (INSERT ... ON CONFLICT) instead of
+-- probing for an open session first. The same index serves check_out()'s
+-- "WHERE user_id = ? AND check_out_at IS NULL".
+
+-- Close all but the newest open session of any user who somehow has several,
+-- otherwise the unique index can't be built
+UPDATE "Sessions" s
+SET check_out_at = NOW()
+WHERE s.check_out_at IS NULL
+AND EXISTS (
+  SELECT 1 FROM "Sessions" newer
+  WHERE newer.user_id = s.user_id
+  AND newer.check_out_at IS NULL
+  AND newer.id > s.id
+);
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS sessions_one_open_per_user
+  ON "Sessions" (user_id)
+  WHERE check_out_at IS NULL;
@@ -0,0 +1,13 @@
+-- Live player count / list per court (check_in, check_out, get_court_status)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sessions_open_by_court
+  ON "Sessions" (court_id, check_in_at)
+  WHERE check_out_at IS NULL;
+
+-- cleanup_expired_sessions(): open sessions older than 2 hours
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sessions_open_by_check_in_at
+  ON "Sessions" (check_in_at)
+  WHERE check_out_at IS NULL;
+
+-- /export/sessions date range
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sessions_check_in_at
+  ON "Sessions" (check_in_at);
@@ -0,0 +1,12 @@
+-- QR check-in looks players up by token (auth_id is already UNIQUE)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS profiles_qr_code_token
+  ON "Profiles" (qr_code_token);
+
+-- Per-user stats and the leaderboard's SUM(points) per user
+CREATE INDEX CONCURRENTLY IF NOT EXISTS stats_user_id
+  ON "Stats" (user_id) INCLUDE (points);
+
+-- /export/stats date range
+CREATE INDEX CONCURRENTLY IF NOT EXISTS stats_created_at
+  ON "Stats" (created_at);
+
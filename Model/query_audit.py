@@ -0,0 +1,278 @@
+"""
+CourtFlow query-plan audit
+
+Finds every SQL statement in courtflow_backend.py (and the export queries in
+exports.py), runs EXPLAIN (ANALYZE, BUFFERS) for each against a seeded local
+database, and exits non-zero if any plan falls back to a sequential scan on
+one of the large tables.
+
+Usage (from the Model folder, against a LOCAL database):
+    python migrate.py                  # schema + indexes
+    python query_audit.py --seed 200000
+    python query_audit.py              # re-audit without re-seeding
+
+Every statement runs inside a transaction that is rolled back, so the
+UPDATEs and INSERTs being audited don't change the data. Export queries are
+explained as DECLARE ... CURSOR, the way exports.py runs them, once with
+sample filters and once with every filter NULL (a full export).
+"""
+
+import argparse
+import ast
+import json
+import os
+import re
+import sys
+import psycopg2
+from db_config import DB_CONFIG
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AUDITED_MODULES = ["courtflow_backend.py", "exports.py"]
+
+# Tables that grow with usage. A Seq Scan on these fails the audit; Courts is
+# a handful of rows, so scanning it is fine.
+LARGE_TABLES = {"Sessions", "Profiles", "Stats"}
+
+
+# =====================================================
+# FINDING STATEMENTS
+# =====================================================
+# Collects (module, line, sql, param names, via_cursor) for:
+# - cursor.execute("""...""", (a, b)) calls with a literal SQL string
+# - dict literals with a "sql" key (the export queries), named %(x)s params,
+#   which run through a server-side cursor
+def find_statements(path):
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    module = os.path.basename(path)
+    statements = []
+
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Attribute)
+                and node.func.attr == "execute"
+                and node.args
+                and isinstance(node.args[0], ast.Constant)
+                and isinstance(node.args[0].value, str)):
+            params = []
+            if len(node.args) > 1 and isinstance(node.args[1], ast.Tuple):
+                params = [ast.unparse(e) for e in node.args[1].elts]
+            statements.append((module, node.lineno, node.args[0].value, params, False))
+
+        elif isinstance(node, ast.Dict):
+            for key, value in zip(node.keys, node.values):
+                if (isinstance(key, ast.Constant) and key.value == "sql"
+                        and isinstance(value, ast.Constant)):
+                    names = re.findall(r"%\((\w+)\)s", value.value)
+                    statements.append((module, value.lineno, value.value, list(dict.fromkeys(names)), True))
+
+    return sorted(statements, key=lambda s: s[1])
+
+
+# =====================================================
+# SAMPLE PARAMETERS
+# =====================================================
+# Realistic values for each parameter name, picked from the seeded data:
+# a user who is checked in, the court they're on, the last week for exports.
+def sample_params(cursor):
+    cursor.execute("""
+        SELECT s.user_id, s.court_id, p.auth_id
+        FROM "Sessions" s
+        JOIN "Profiles" p ON p.id = s.user_id
+        WHERE s.check_out_at IS NULL
+        AND p.auth_id IS NOT NULL
+        LIMIT 1;
+    """)
+    row = cursor.fetchone()
+    if not row:
+        raise SystemExit("No open sessions found: seed the database first (--seed)")
+
+    user_id, court_id, auth_id = row
+    cursor.execute("SELECT NOW() - INTERVAL '7 days', NOW();")
+    start, end = cursor.fetchone()
+
+    return {
+        "user_id": user_id,
+        "court_id": court_id,
+        "auth_uuid": str(auth_id),
+        "status": "Open",
+        "start": start,
+        "end": end,
+    }
+
+
+# =====================================================
+# SEEDING (LOCAL DATABASES ONLY)
+# =====================================================
+# sessions rows spread over the last year, 1 profile per 10 sessions, 1 stat
+# per session, and ~5% of players currently checked in. Safe to run again:
+# each run only touches the profiles and sessions it created, so nobody ends
+# up with two open sessions (sessions_one_open_per_user).
+def seed(conn, sessions):
+    profiles = max(100, sessions // 10)
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM "Profiles";')
+    last_profile = cursor.fetchone()[0]
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM "Sessions";')
+    last_session = cursor.fetchone()[0]
+
+    cursor.execute("""
+        INSERT INTO "Courts" (name, max_capacity, status)
+        SELECT 'Audit Court ' || g, 10, 'Open'
+        FROM generate_series(1, 50) g;
+    """)
+    cursor.execute("""
+        INSERT INTO "Profiles" (fname, lname, email, qr_code_token, auth_id)
+        SELECT 'Audit', 'Player ' || g, 'audit' || g || '@example.com',
+               10000000 + g, gen_random_uuid()
+        FROM generate_series(%s + 1, %s + %s) g;
+    """, (last_profile, last_profile, profiles))
+    cursor.execute("""
+        INSERT INTO "Sessions" (user_id, court_id, check_in_at, check_out_at)
+        SELECT p.id, c.id, t, t + INTERVAL '1 hour'
+        FROM generate_series(1, %s) g
+        CROSS JOIN LATERAL (SELECT NOW() - INTERVAL '1 day' - random() * INTERVAL '365 days' AS t) times
+        JOIN (SELECT id, row_number() OVER (ORDER BY id) AS n FROM "Profiles" WHERE id > %s) p
+          ON p.n = 1 + g %% %s
+        JOIN (SELECT id, row_number() OVER (ORDER BY id) AS n FROM "Courts") c
+          ON c.n = 1 + g %% 50;
+    """, (sessions, last_profile, profiles))
+    cursor.execute("""
+        INSERT INTO "Sessions" (user_id, court_id, check_in_at)
+        SELECT p.id, c.id, NOW() - random() * INTERVAL '90 minutes'
+        FROM (SELECT id, row_number() OVER (ORDER BY id) AS n FROM "Profiles" WHERE id > %s) p
+        JOIN (SELECT id, row_number() OVER (ORDER BY id) AS n FROM "Courts") c
+          ON c.n = 1 + p.n %% 50
+        WHERE p.n %% 20 = 0;
+    """, (last_profile,))
+    cursor.execute("""
+        INSERT INTO "Stats" (user_id, action_type, points, session_id, created_at)
+        SELECT s.user_id, 'game', (s.id %% 30)::int, s.id, s.check_in_at + INTERVAL '30 minutes'
+        FROM "Sessions" s
+        WHERE s.id > %s;
+    """, (last_session,))
+    conn.commit()
+
+    conn.autocommit = True
+    for table in ("Courts", "Profiles", "Sessions", "Stats"):
+        cursor.execute(f'ANALYZE "{table}";')
+    conn.autocommit = False
+    cursor.close()
+
+
+# =====================================================
+# PLAN CHECKS
+# =====================================================
+def walk_plan(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+# Statements that run through a named cursor are explained as DECLARE, so
+# the planner picks the same fast-start plan it uses for the real cursor
+def explain(cursor, sql, params, samples, via_cursor=False):
+    missing = [p for p in params if p not in samples]
+    if missing:
+        raise KeyError(f"no sample value for {', '.join(missing)}")
+
+    statement = sql.strip().rstrip(";")
+    if re.search(r"%\(\w+\)s", statement):
+        args = {p: samples[p] for p in params}
+    else:
+        args = tuple(samples[p] for p in params)
+
+    if via_cursor:
+        statement = "DECLARE audit_cursor CURSOR FOR " + statement
+
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, args)
+    result = cursor.fetchone()[0]
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+# Optional filters are written "%(x)s::type IS NULL OR ...". Statements with
+# any are audited with the sample values and again with all of them NULL,
+# which is the plan an unfiltered export gets.
+def variants(sql, samples):
+    optional = set(re.findall(r"%\((\w+)\)s::\w+ IS NULL", sql))
+    yield "", samples
+    if optional:
+        yield " [unfiltered]", dict(samples, **{p: None for p in optional})
+
+
+def audit(conn, tables):
+    samples_cursor = conn.cursor()
+    samples = sample_params(samples_cursor)
+    samples_cursor.close()
+    conn.rollback()
+
+    failures = 0
+    checked = 0
+    statements = []
+    for module in AUDITED_MODULES:
+        statements += find_statements(os.path.join(HERE, module))
+
+    for module, line, sql, params, via_cursor in statements:
+        first_line = " ".join(sql.split())[:70]
+
+        for label, values in variants(sql, samples):
+            location = f"{module}:{line}{label}"
+            checked += 1
+            cursor = conn.cursor()
+
+            try:
+                plan = explain(cursor, sql, params, values, via_cursor)
+            except Exception as e:
+                conn.rollback()
+                failures += 1
+                print(f"ERROR {location}  {first_line}\n      {e}")
+                continue
+            finally:
+                cursor.close()
+
+            # Roll back whatever ANALYZE actually executed (UPDATE/INSERT)
+            conn.rollback()
+
+            nodes = list(walk_plan(plan["Plan"]))
+            seq_scans = sorted({
+                n["Relation Name"] for n in nodes
+                if n["Node Type"] == "Seq Scan" and n.get("Relation Name") in tables
+            })
+            hit = plan["Plan"].get("Shared Hit Blocks", 0)
+            read = plan["Plan"].get("Shared Read Blocks", 0)
+            timing = f"{plan['Execution Time']:.2f}ms, buffers hit={hit} read={read}"
+
+            if seq_scans:
+                failures += 1
+                print(f"FAIL  {location}  {first_line}\n      Seq Scan on {', '.join(seq_scans)} ({timing})")
+            else:
+                print(f"ok    {location}  {first_line}\n      {plan['Plan']['Node Type']} ({timing})")
+
+    print(f"\n{len(statements)} statements, {checked} plans checked, {failures} failing")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE every CourtFlow query and fail on sequential scans")
+    parser.add_argument("--seed", type=int, default=0, metavar="N", help="first insert N fake sessions (local DB only)")
+    parser.add_argument("--tables", default=",".join(sorted(LARGE_TABLES)), help="tables that must not be seq scanned")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        if args.seed:
+            print(f"Seeding {args.seed} sessions...")
+            seed(conn, args.seed)
+        failures = audit(conn, set(args.tables.split(",")))
+    finally:
+        conn.close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+CourtFlow Response Cache
+
+Short-TTL cache for the read endpoints every viewer polls (court status,
+profile, active sessions, leaderboard, dashboard analytics). Responses are
+stored as pre-serialized JSON bytes so a hit skips both the DB and
+json encoding.
+
+Features:
+- Per-key TTLs
+- In-process LRU backend bounded by total bytes, or Redis (RESPONSE_CACHE_BACKEND=redis)
+- Request coalescing: concurrent misses on one key share a single DB query
+- Invalidation hooks for check-in, check-out, expiry and Stats inserts
+
+Invalidation only reaches other processes through Redis. With the default
+memory backend, courtflow_backend.py and View/app.py each keep their own
+cache, so a check-in handled by one doesn't evict the other's entries: those
+keys are only bounded by their TTL. Use RESPONSE_CACHE_BACKEND=redis when the
+two apps (or several gunicorn workers) serve the same data.
+"""
+
+from collections import OrderedDict
+from flask import Response
+import json
+import os
+import threading
+import time
+
+# =====================================================
+# CONFIG
+# =====================================================
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+# TTLs in seconds. Writes invalidate explicitly; the TTL only bounds how stale
+# a response can get from changes made outside this backend.
+COURT_TTL = float(os.environ.get("CACHE_COURT_TTL", "5"))
+PROFILE_TTL = float(os.environ.get("CACHE_PROFILE_TTL", "60"))
+ACTIVE_SESSIONS_TTL = float(os.environ.get("CACHE_ACTIVE_SESSIONS_TTL", "5"))
+LEADERBOARD_TTL = float(os.environ.get("CACHE_LEADERBOARD_TTL", "30"))
+DASHBOARD_TTL = float(os.environ.get("CACHE_DASHBOARD_TTL", "15"))
+
+# How long a coalesced request waits on the in-flight query before giving up
+# and running its own
+COALESCE_TIMEOUT = 5.0
+
+# =====================================================
+# CACHE KEYS
+# =====================================================
+ACTIVE_SESSIONS_KEY = "active_sessions"
+LEADERBOARD_KEY = "leaderboard"
+DASHBOARD_KEYS = ["dashboard:stats", "dashboard:utilization", "dashboard:heatmap"]
+
+def court_key(court_id):
+    return f"court:{court_id}"
+
+def profile_key(user_id):
+    return f"profile:{user_id}"
+
+
+# =====================================================
+# BACKENDS
+# =====================================================
+# In-process LRU. Entries are (expires_at, body); the oldest entries are
+# evicted once the bodies add up to more than max_bytes.
+class MemoryBackend:
+
+    shared = False
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, body, ttl):
+        with self.lock:
+            self._remove(key)
+            if len(body) > self.max_bytes:
+                return
+            self.entries[key] = (time.monotonic() + ttl, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.size -= len(entry[1])
+
+    def info(self):
+        with self.lock:
+            return {"backend": "memory", "entries": len(self.entries), "bytes": self.size}
+
+
+# Shared across backend processes. Memory bounds come from Redis' own
+# maxmemory / allkeys-lru policy.
+class RedisBackend:
+
+    PREFIX = "courtflow:cache:"
+    shared = True
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self.client.get(self.PREFIX + key)
+
+    def set(self, key, body, ttl):
+        self.client.set(self.PREFIX + key, body, px=int(ttl * 1000))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.PREFIX + k for k in keys])
+
+    # Never the URL itself: it may carry the Redis password
+    def info(self):
+        kwargs = self.client.connection_pool.connection_kwargs
+        return {
+            "backend": "redis",
+            "host": kwargs.get("host", kwargs.get("path")),
+            "port": kwargs.get("port"),
+            "db": kwargs.get("db"),
+        }
+
+
+def _create_backend():
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(REDIS_URL)
+    if RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryBackend(RESPONSE_CACHE_MAX_BYTES)
+    raise RuntimeError(f"Unknown RESPONSE_CACHE_BACKEND: {RESPONSE_CACHE_BACKEND}")
+
+backend = _create_backend()
+
+
+# =====================================================
+# SHARED STATE
+# =====================================================
+# One in-flight query per key. Followers wait on the leader's event.
+class _Flight:
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.body = None
+        self.status = None
+
+
+_lock = threading.Lock()
+_inflight = {}
+# Bumped on every invalidation so a query that started before the write
+# doesn't put its (now stale) result back into the cache
+_generations = {}
+
+_counters = {
+    "hits": 0,
+    "misses": 0,
+    "coalesced": 0,
+    "invalidations": 0,
+    "errors": 0,
+}
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def _serialize(payload):
+    return json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+
+
+# =====================================================
+# CACHED RESPONSES
+# =====================================================
+# cached_json() returns (body_bytes, status) for key. On a miss it calls
+# load(), which returns (payload, status). Only 200s are cached, so a 404
+# for a court that's about to be created isn't remembered.
+def cached_json(key, ttl, load):
+
+    try:
+        body = backend.get(key)
+    except Exception as e:
+        print(f"Response cache error: {e}")
+        _count("errors")
+        body = None
+
+    if body is not None:
+        _count("hits")
+        return body, 200
+
+    with _lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+            generation = _generations.get(key, 0)
+
+    if not leader:
+        _count("coalesced")
+        if flight.event.wait(COALESCE_TIMEOUT) and flight.body is not None:
+            return flight.body, flight.status
+        payload, status = load()
+        return _serialize(payload), status
+
+    _count("misses")
+    try:
+        payload, status = load()
+        flight.body = _serialize(payload)
+        flight.status = status
+
+        if status == 200:
+            _store(key, generation, flight.body, ttl)
+
+        return flight.body, flight.status
+
+    finally:
+        with _lock:
+            # invalidate() may already have replaced this flight
+            if _inflight.get(key) is flight:
+                del _inflight[key]
+        flight.event.set()
+
+
+# Caches body unless key was invalidated since its query started. For the
+# memory backend the check and the set happen under _lock, which invalidate()
+# also holds while bumping the generation, so a stale body can't slip in.
+# Redis calls aren't made under _lock; an invalidation landing between the
+# check and the set can leave a stale body there for at most its TTL.
+def _store(key, generation, body, ttl):
+    try:
+        if backend.shared:
+            with _lock:
+                fresh = _generations.get(key, 0) == generation
+            if fresh:
+                backend.set(key, body, ttl)
+        else:
+            with _lock:
+                if _generations.get(key, 0) == generation:
+                    backend.set(key, body, ttl)
+    except Exception as e:
+        print(f"Response cache error: {e}")
+        _count("errors")
+
+
+def json_response(body, status=200):
+    return Response(body, status=status, mimetype="application/json")
+
+
+# =====================================================
+# INVALIDATION
+# =====================================================
+# Requests arriving after this start a fresh query instead of joining one
+# that began before the write
+def invalidate(*keys):
+    with _lock:
+        for key in keys:
+            _generations[key] = _generations.get(key, 0) + 1
+            _inflight.pop(key, None)
+        _counters["invalidations"] += len(keys)
+
+    try:
+        backend.delete(*keys)
+    except Exception as e:
+        print(f"Response cache error: {e}")
+        _count("errors")
+
+
+# A session started, ended or expired on court_id (None if the court isn't
+# known, e.g. checkout by user id in View/app.py)
+def invalidate_court(court_id=None):
+    keys = [ACTIVE_SESSIONS_KEY] + DASHBOARD_KEYS
+    if court_id is not None:
+        keys.append(court_key(court_id))
+    invalidate(*keys)
+
+
+# Call after inserting into Stats
+def invalidate_leaderboard():
+    invalidate(LEADERBOARD_KEY, *DASHBOARD_KEYS)
+
+
+# =====================================================
+# METRICS
+# =====================================================
+def stats():
+    with _lock:
+        result = dict(_counters)
+        result["in_flight"] = len(_inflight)
+
+    try:
+        result.update(backend.info())
+    except Exception as e:
+        result["backend_error"] = str(e)
+    return result
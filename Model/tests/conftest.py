@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The Model modules import each other as top-level modules (see View/app.py)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,226 @@
+import importlib
+import threading
+import time
+
+import pytest
+
+import admission_control
+
+
+@pytest.fixture
+def ac(monkeypatch):
+    # Fresh module state (buckets, queues, counters) for every test
+    module = importlib.reload(admission_control)
+    monkeypatch.setattr(module, "USER_RATE", 1.0)
+    monkeypatch.setattr(module, "USER_BURST", 2.0)
+    monkeypatch.setattr(module, "COURT_RATE", 100.0)
+    monkeypatch.setattr(module, "COURT_BURST", 100.0)
+    monkeypatch.setattr(module, "COURT_CONCURRENCY", 1)
+    monkeypatch.setattr(module, "COURT_QUEUE_LIMIT", 2)
+    monkeypatch.setattr(module, "QUEUE_TIMEOUT", 0.2)
+    monkeypatch.setattr(module, "CHECKED_IN_TTL", 0.2)
+    monkeypatch.setattr(module, "FULL_COURT_TTL", 0.2)
+    return module
+
+
+# =====================================================
+# TOKEN BUCKET
+# =====================================================
+def test_token_bucket_allows_burst_then_reports_wait():
+    bucket = admission_control.TokenBucket(rate=2.0, burst=3, now=0.0)
+
+    assert [bucket.take(0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(0.0) == pytest.approx(0.5)
+
+
+def test_token_bucket_refills_up_to_burst():
+    bucket = admission_control.TokenBucket(rate=2.0, burst=2, now=0.0)
+    bucket.take(0.0)
+    bucket.take(0.0)
+
+    assert bucket.take(0.5) == 0.0
+    # A long idle period never banks more than burst tokens
+    assert bucket.take(100.0) == 0.0
+    assert bucket.take(100.0) == 0.0
+    assert bucket.take(100.0) > 0
+
+
+def test_admit_sheds_user_over_rate_with_retry_after(ac):
+    ac.admit(1)
+    ac.admit(1)
+
+    with pytest.raises(ac.Rejected) as rejected:
+        ac.admit(1)
+
+    assert rejected.value.status == 429
+    assert rejected.value.retry_after_header() == "1"
+    assert ac.stats()["counters"]["shed_user_rate"] == 1
+    # Other users have their own bucket
+    ac.admit(2)
+
+
+# =====================================================
+# PRE-CHECKS
+# =====================================================
+def test_already_checked_in_precheck_expires(ac):
+    ac.record_check_in(1, court_id=7, court_full=False)
+
+    with pytest.raises(ac.Rejected) as rejected:
+        ac.admit(1, 7, checking_in=True)
+    assert rejected.value.status == 400
+
+    # Only trusted briefly: after CHECKED_IN_TTL the DB decides again
+    time.sleep(0.25)
+    ac.admit(1, 7, checking_in=True)
+
+
+def test_rejection_does_not_extend_already_checked_in(ac):
+    ac.record_already_checked_in(1)
+    time.sleep(0.25)
+
+    ac.admit(1, 7, checking_in=True)
+
+
+def test_check_out_clears_prechecks(ac):
+    ac.record_check_in(1, court_id=7, court_full=True)
+    assert ac.known_court(1) == 7
+
+    ac.record_check_out(1, 7)
+
+    assert ac.known_court(1) is None
+    ac.admit(2, 7, checking_in=True)
+    ac.admit(1, 7, checking_in=True)
+
+
+def test_court_full_precheck(ac):
+    ac.record_court_full(7)
+
+    with pytest.raises(ac.Rejected) as rejected:
+        ac.admit(1, 7, checking_in=True)
+    assert rejected.value.status == 403
+
+    # Check-outs don't consult the court-full flag
+    ac.admit(2, 7)
+
+    time.sleep(0.25)
+    ac.admit(3, 7, checking_in=True)
+
+
+def test_known_court_outlives_checked_in_precheck(ac):
+    ac.record_check_in(1, court_id=7, court_full=False)
+    time.sleep(0.25)
+
+    ac.admit(1, 7, checking_in=True)
+    assert ac.known_court(1) == 7
+
+
+# =====================================================
+# COURT QUEUE
+# =====================================================
+def _hold_slot(ac, court_id, started, release):
+    with ac.court_slot(court_id):
+        started.set()
+        release.wait(5)
+
+
+def test_court_slot_sheds_when_queue_full(ac):
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=_hold_slot, args=(ac, 7, started, release))
+    holder.start()
+    started.wait(5)
+
+    results = []
+
+    def wait_for_slot():
+        try:
+            with ac.court_slot(7):
+                results.append("ok")
+        except ac.Rejected as rejected:
+            results.append(rejected.status)
+
+    waiters = [threading.Thread(target=wait_for_slot) for _ in range(2)]
+    for waiter in waiters:
+        waiter.start()
+    while ac.stats()["queue_depth"] < 2:
+        time.sleep(0.01)
+
+    # Queue is at COURT_QUEUE_LIMIT: the next arrival is shed immediately
+    with pytest.raises(ac.Rejected) as rejected:
+        with ac.court_slot(7):
+            pass
+    assert rejected.value.status == 503
+    assert rejected.value.retry_after is not None
+
+    release.set()
+    holder.join()
+    for waiter in waiters:
+        waiter.join()
+
+    assert results == ["ok", "ok"]
+    counters = ac.stats()["counters"]
+    assert counters["shed_queue_full"] == 1
+    assert counters["admitted"] == 3
+
+
+def test_court_slot_times_out(ac):
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=_hold_slot, args=(ac, 7, started, release))
+    holder.start()
+    started.wait(5)
+
+    try:
+        began = time.monotonic()
+        with pytest.raises(ac.Rejected) as rejected:
+            with ac.court_slot(7):
+                pass
+        assert rejected.value.status == 503
+        assert time.monotonic() - began >= 0.2
+        assert ac.stats()["counters"]["shed_queue_timeout"] == 1
+    finally:
+        release.set()
+        holder.join()
+
+    # The slot is free again once the holder leaves
+    with ac.court_slot(7):
+        pass
+    assert ac.stats()["queue_depth"] == 0
+
+
+def test_court_slot_releases_on_error(ac):
+    with pytest.raises(ValueError):
+        with ac.court_slot(7):
+            raise ValueError("db error")
+
+    with ac.court_slot(7):
+        assert ac.stats()["courts"]["7"]["active"] == 1
+
+
+def test_idle_court_queues_are_pruned(ac):
+    # Random court ids (which may not exist) must not pile up queues
+    for court_id in range(100):
+        with ac.court_slot(court_id):
+            pass
+
+    release = threading.Event()
+    entered = threading.Event()
+
+    def hold():
+        with ac.court_slot(7):
+            entered.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    assert entered.wait(5)
+
+    ac._last_prune = time.monotonic() - ac.BUCKET_IDLE_SECONDS - 1
+    ac.admit(1)
+
+    # Only the court with a request in flight keeps its queue
+    assert list(ac._court_queues) == [7]
+    release.set()
+    holder.join()
+
+    ac._last_prune = time.monotonic() - ac.BUCKET_IDLE_SECONDS - 1
+    ac.admit(2)
+    assert ac._court_queues == {}
@@ -0,0 +1,90 @@
+"""
+Export streaming tests with a fake cursor. No database needed.
+"""
+
+import json
+import zlib
+
+import pytest
+
+import exports
+
+
+class FakeCursor:
+
+    def __init__(self, rows, fail_after=None):
+        self.rows = rows
+        self.fail_after = fail_after
+        self.closed = False
+
+    def __iter__(self):
+        for count, row in enumerate(self.rows):
+            if count == self.fail_after:
+                raise RuntimeError("canceling statement due to conflict with recovery")
+            yield row
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+EXPORT = {"filename": "test", "columns": ["id", "name"], "sql": ""}
+ROWS = [(i, f"player {i}") for i in range(2500)]
+
+
+def _stream(fmt, compress=False, fail_after=None):
+    conn, cursor = FakeConnection(), FakeCursor(ROWS, fail_after)
+    chunks = []
+    error = None
+    try:
+        for chunk in exports.stream_export(conn, cursor, EXPORT, fmt, compress):
+            chunks.append(chunk)
+    except RuntimeError as e:
+        error = e
+    assert cursor.closed and conn.closed
+    return b"".join(chunks), error
+
+
+def test_complete_csv():
+    body, error = _stream("csv")
+    lines = body.decode().splitlines()
+    assert error is None
+    assert lines[0] == "id,name"
+    assert len(lines) == len(ROWS) + 1
+
+
+def test_complete_json_gzip():
+    body, error = _stream("json", compress=True)
+    assert error is None
+    assert len(json.loads(zlib.decompress(body, 31))) == len(ROWS)
+
+
+def test_failed_csv_ends_with_failure_line_and_raises():
+    body, error = _stream("csv", fail_after=1500)
+    assert error is not None
+    assert body.decode().rstrip().endswith("EXPORT FAILED after 1500 rows: incomplete file")
+
+
+def test_failed_json_is_not_valid_json():
+    body, error = _stream("json", fail_after=1500)
+    assert error is not None
+    with pytest.raises(ValueError):
+        json.loads(body)
+
+
+def test_failed_gzip_is_truncated():
+    body, error = _stream("csv", compress=True, fail_after=1500)
+    assert error is not None
+    with pytest.raises(zlib.error):
+        zlib.decompress(body, 31)
@@ -0,0 +1,69 @@
+"""
+Migration runner tests: failed CREATE INDEX CONCURRENTLY builds must not
+leave an INVALID index behind for IF NOT EXISTS to skip. Needs TEST_DB_*.
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("dotenv")
+psycopg2 = pytest.importorskip("psycopg2")
+
+import db_config
+import migrate
+
+BUILD = """
+    CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS migrate_test_one_open
+      ON migrate_test (user_id)
+      WHERE check_out_at IS NULL;
+"""
+
+
+@pytest.fixture
+def cursor():
+    if not os.environ.get("TEST_DB_HOST"):
+        pytest.skip("TEST_DB_* not configured")
+
+    conn = psycopg2.connect(**db_config.from_env("TEST_DB"))
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS migrate_test;")
+    cursor.execute("CREATE TABLE migrate_test (user_id bigint, check_out_at timestamptz);")
+    try:
+        yield cursor
+    finally:
+        cursor.execute("DROP TABLE IF EXISTS migrate_test;")
+        cursor.close()
+        conn.close()
+
+
+def _add_duplicate_open_sessions(cursor):
+    cursor.execute("INSERT INTO migrate_test (user_id) VALUES (1), (1);")
+
+
+def test_failed_build_leaves_no_invalid_index(cursor):
+    _add_duplicate_open_sessions(cursor)
+
+    with pytest.raises(psycopg2.IntegrityError):
+        migrate.run_statement(cursor, BUILD)
+
+    assert migrate.index_is_valid(cursor, "migrate_test_one_open") is None
+
+
+def test_invalid_leftover_is_rebuilt(cursor):
+    _add_duplicate_open_sessions(cursor)
+    with pytest.raises(psycopg2.IntegrityError):
+        cursor.execute(BUILD)
+    assert migrate.index_is_valid(cursor, "migrate_test_one_open") is False
+
+    cursor.execute("DELETE FROM migrate_test;")
+    migrate.run_statement(cursor, BUILD)
+
+    assert migrate.index_is_valid(cursor, "migrate_test_one_open") is True
+
+
+def test_plain_statements_run_unchanged(cursor):
+    migrate.run_statement(cursor, "INSERT INTO migrate_test (user_id) VALUES (1);")
+    cursor.execute("SELECT count(*) FROM migrate_test;")
+    assert cursor.fetchone()[0] == 1
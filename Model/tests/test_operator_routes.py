@@ -0,0 +1,65 @@
+"""
+Operator-only routes: exports and the replica / cache / admission status
+pages. No database needed.
+"""
+
+import importlib
+import os
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("supabase")
+pytest.importorskip("jwt")
+pytest.importorskip("psycopg2")
+
+OPERATOR_ROUTES = [
+    "/export/sessions",
+    "/export/stats",
+    "/replica/status",
+    "/cache/stats",
+    "/admission/stats",
+]
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setenv("OPERATOR_IDS", "7, 9")
+    monkeypatch.delenv("REPLICA_DB_HOST", raising=False)
+    monkeypatch.setenv("SUPABASE_URL", os.environ.get("SUPABASE_URL", "http://localhost:54321"))
+    monkeypatch.setenv("SUPABASE_SERVICE_KEY", os.environ.get("SUPABASE_SERVICE_KEY", "test-service-key"))
+
+    import courtflow_backend
+    return importlib.reload(courtflow_backend)
+
+
+def _as_user(backend, monkeypatch, user_id):
+    monkeypatch.setattr(backend, "get_profile_id_from_token", lambda: user_id)
+    return backend.app.test_client()
+
+
+@pytest.mark.parametrize("route", OPERATOR_ROUTES)
+def test_anonymous_is_unauthorized(backend, monkeypatch, route):
+    assert _as_user(backend, monkeypatch, None).get(route).status_code == 401
+
+
+@pytest.mark.parametrize("route", OPERATOR_ROUTES)
+def test_players_are_forbidden(backend, monkeypatch, route):
+    assert _as_user(backend, monkeypatch, 8).get(route).status_code == 403
+
+
+@pytest.mark.parametrize("route", ["/replica/status", "/cache/stats", "/admission/stats"])
+def test_operators_see_status(backend, monkeypatch, route):
+    assert _as_user(backend, monkeypatch, 9).get(route).status_code == 200
+
+
+def test_redis_info_hides_password(monkeypatch):
+    pytest.importorskip("redis")
+    import response_cache
+
+    backend = response_cache.RedisBackend("redis://:s3cret@cache.internal:6380/2")
+    info = backend.info()
+
+    assert info == {"backend": "redis", "host": "cache.internal", "port": 6380, "db": 2}
+    assert "s3cret" not in str(info)
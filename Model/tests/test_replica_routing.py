@@ -0,0 +1,190 @@
+"""
+Read-replica routing tests.
+
+The DB tests need a primary and a second Postgres, ideally a streaming
+replica of it (pg_basebackup -R), and are skipped unless these are set:
+
+    TEST_DB_HOST, TEST_DB_PORT, TEST_DB_NAME, TEST_DB_USER, TEST_DB_PASSWORD
+    TEST_REPLICA_DB_HOST, TEST_REPLICA_DB_PORT, TEST_REPLICA_DB_USER, TEST_REPLICA_DB_PASSWORD
+"""
+
+import importlib
+import os
+import socket
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("supabase")
+pytest.importorskip("jwt")
+pytest.importorskip("psycopg2")
+
+DB_SETTINGS = ["DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASSWORD"]
+REPLICA_SETTINGS = ["REPLICA_DB_HOST", "REPLICA_DB_PORT", "REPLICA_DB_USER", "REPLICA_DB_PASSWORD"]
+
+
+def _load_backend(monkeypatch, env):
+    for key, value in env.items():
+        if value:
+            monkeypatch.setenv(key, value)
+        else:
+            monkeypatch.delenv(key, raising=False)
+    monkeypatch.setenv("SUPABASE_URL", os.environ.get("SUPABASE_URL", "http://localhost:54321"))
+    monkeypatch.setenv("SUPABASE_SERVICE_KEY", os.environ.get("SUPABASE_SERVICE_KEY", "test-service-key"))
+
+    import courtflow_backend
+    return importlib.reload(courtflow_backend)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    if not os.environ.get("TEST_REPLICA_DB_HOST"):
+        pytest.skip("TEST_DB_* / TEST_REPLICA_DB_* not configured")
+
+    env = {key: os.environ.get(f"TEST_{key}", "") for key in DB_SETTINGS + REPLICA_SETTINGS}
+    module = _load_backend(monkeypatch, env)
+    monkeypatch.setattr(module, "REPLICA_LAG_CHECK_SECONDS", 0)
+    return module
+
+
+def _port(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW port;")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _primary_port():
+    return os.environ.get("TEST_DB_PORT") or "5432"
+
+
+def _replica_port():
+    return os.environ.get("TEST_REPLICA_DB_PORT") or _primary_port()
+
+
+# =====================================================
+# LAG DECISION (NO DB)
+# =====================================================
+@pytest.fixture
+def lag_from_status(monkeypatch):
+    module = _load_backend(monkeypatch, {"REPLICA_DB_HOST": ""})
+    return module.replica_lag_from_status
+
+
+def test_lag_is_zero_when_not_in_recovery(lag_from_status):
+    assert lag_from_status(False, None, None) == 0.0
+
+
+def test_lag_reported_while_streaming(lag_from_status):
+    assert lag_from_status(True, "streaming", 0) == 0.0
+    assert lag_from_status(True, "streaming", 1.5) == 1.5
+
+
+@pytest.mark.parametrize("status", [None, "stopping", "waiting", "starting"])
+def test_broken_replication_is_unhealthy_even_when_replay_caught_up(lag_from_status, status):
+    # receive LSN == replay LSN reports 0 lag; a stalled receiver must not
+    assert lag_from_status(True, status, 0) is None
+
+
+def test_unknown_replay_lag_is_unhealthy(lag_from_status):
+    assert lag_from_status(True, "streaming", None) is None
+
+
+# =====================================================
+# ROUTING (PRIMARY + REPLICA)
+# =====================================================
+def test_reads_go_to_healthy_replica(backend):
+    assert _port(backend.get_read_connection()) == _replica_port()
+    assert backend._replica_state["replica_reads"] == 1
+    assert backend._replica_state["healthy"]
+
+
+def test_live_replica_lag_is_measured(backend):
+    conn = backend.psycopg2.connect(**backend.REPLICA_DB_CONFIG)
+    try:
+        lag = backend.measure_replica_lag(conn)
+    finally:
+        conn.close()
+
+    assert lag is not None
+    assert lag < backend.REPLICA_MAX_LAG_SECONDS
+
+
+def test_writer_is_pinned_to_primary(backend, monkeypatch):
+    monkeypatch.setattr(backend, "READ_YOUR_WRITES_SECONDS", 60)
+    backend.pin_to_primary(42)
+    backend.pin_to_primary(("court", 7))
+
+    assert _port(backend.get_read_connection(42)) == _primary_port()
+    assert _port(backend.get_read_connection(("court", 7))) == _primary_port()
+    assert _port(backend.get_read_connection(43)) == _replica_port()
+    assert backend._replica_state["pinned_reads"] == 2
+
+
+def test_pin_expires(backend, monkeypatch):
+    monkeypatch.setattr(backend, "READ_YOUR_WRITES_SECONDS", 0)
+    backend.pin_to_primary(42)
+
+    assert _port(backend.get_read_connection(42)) == _replica_port()
+
+
+def test_falls_back_when_lag_exceeds_threshold(backend, monkeypatch):
+    monkeypatch.setattr(backend, "measure_replica_lag", lambda conn: backend.REPLICA_MAX_LAG_SECONDS + 1)
+    assert _port(backend.get_read_connection()) == _primary_port()
+    assert not backend._replica_state["healthy"]
+    assert backend._replica_state["fallbacks"] == 1
+
+    # Back on the replica once it catches up
+    monkeypatch.setattr(backend, "measure_replica_lag", lambda conn: 0.0)
+    assert _port(backend.get_read_connection()) == _replica_port()
+
+
+def test_falls_back_when_replication_is_broken(backend, monkeypatch):
+    monkeypatch.setattr(backend, "measure_replica_lag", lambda conn: None)
+
+    assert _port(backend.get_read_connection()) == _primary_port()
+    assert backend._replica_state["lag_seconds"] is None
+
+
+def test_unhealthy_replica_not_retried_until_next_check(backend, monkeypatch):
+    monkeypatch.setattr(backend, "REPLICA_LAG_CHECK_SECONDS", 60)
+    monkeypatch.setattr(backend, "measure_replica_lag", lambda conn: None)
+    backend.get_read_connection()
+
+    monkeypatch.setattr(backend, "measure_replica_lag", lambda conn: 0.0)
+    assert _port(backend.get_read_connection()) == _primary_port()
+    assert backend._replica_state["fallbacks"] == 2
+
+
+def test_falls_back_when_replica_unreachable(backend, monkeypatch):
+    # A listener that never accepts or answers: the TCP handshake completes
+    # but the startup reply never comes, like a hung or blackholed replica
+    blackhole = socket.socket()
+    blackhole.bind(("127.0.0.1", 0))
+    blackhole.listen(16)
+    monkeypatch.setitem(backend.REPLICA_DB_CONFIG, "host", "127.0.0.1")
+    monkeypatch.setitem(backend.REPLICA_DB_CONFIG, "port", str(blackhole.getsockname()[1]))
+    monkeypatch.setitem(backend.REPLICA_DB_CONFIG, "connect_timeout", 2)
+
+    try:
+        started = time.monotonic()
+        assert _port(backend.get_read_connection()) == _primary_port()
+        elapsed = time.monotonic() - started
+    finally:
+        blackhole.close()
+
+    assert elapsed < 5
+    assert not backend._replica_state["healthy"]
+
+
+def test_falls_back_when_replica_refuses(backend, monkeypatch):
+    monkeypatch.setitem(backend.REPLICA_DB_CONFIG, "host", "127.0.0.1")
+    monkeypatch.setitem(backend.REPLICA_DB_CONFIG, "port", "1")
+
+    assert _port(backend.get_read_connection()) == _primary_port()
+    assert not backend._replica_state["healthy"]
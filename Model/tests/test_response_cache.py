@@ -0,0 +1,146 @@
+"""
+Response cache tests: LRU bounds, coalescing and invalidation races.
+No database needed.
+"""
+
+import importlib
+import threading
+
+import pytest
+
+pytest.importorskip("flask")
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setenv("RESPONSE_CACHE_BACKEND", "memory")
+    import response_cache
+    return importlib.reload(response_cache)
+
+
+# Load function that blocks until released, so tests can act mid-query
+class SlowLoad:
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return self.payload, 200
+
+
+def _in_thread(target):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", target()))
+    thread.start()
+    return thread, result
+
+
+# =====================================================
+# MEMORY BACKEND
+# =====================================================
+def test_memory_backend_evicts_least_recently_used(cache):
+    backend = cache.MemoryBackend(max_bytes=10)
+    backend.set("a", b"aaaa", 60)
+    backend.set("b", b"bbbb", 60)
+    backend.get("a")
+    backend.set("c", b"cccc", 60)
+
+    assert backend.get("b") is None
+    assert backend.get("a") == b"aaaa"
+    assert backend.size == 8
+
+
+def test_memory_backend_expires_entries(cache):
+    backend = cache.MemoryBackend(max_bytes=100)
+    backend.set("a", b"aaaa", 0)
+
+    assert backend.get("a") is None
+    assert backend.size == 0
+
+
+# =====================================================
+# CACHED RESPONSES
+# =====================================================
+def test_hit_after_miss(cache):
+    load = SlowLoad({"x": 1})
+    load.release.set()
+
+    assert cache.cached_json("k", 60, load) == (b'{"x":1}', 200)
+    assert cache.cached_json("k", 60, load) == (b'{"x":1}', 200)
+    assert load.calls == 1
+
+
+def test_errors_are_not_cached(cache):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {"error": "Court not found"}, 404
+
+    cache.cached_json("k", 60, load)
+    cache.cached_json("k", 60, load)
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_share_one_query(cache):
+    load = SlowLoad({"x": 1})
+    leader, leader_result = _in_thread(lambda: cache.cached_json("k", 60, load))
+    assert load.started.wait(5)
+
+    follower, follower_result = _in_thread(lambda: cache.cached_json("k", 60, load))
+    load.release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert load.calls == 1
+    assert follower_result["value"] == leader_result["value"] == (b'{"x":1}', 200)
+
+
+def test_request_after_invalidation_does_not_join_older_query(cache):
+    before = SlowLoad({"players": 0})
+    leader, leader_result = _in_thread(lambda: cache.cached_json("k", 60, before))
+    assert before.started.wait(5)
+
+    cache.invalidate("k")
+
+    after = SlowLoad({"players": 1})
+    after.release.set()
+    assert cache.cached_json("k", 60, after) == (b'{"players":1}', 200)
+
+    before.release.set()
+    leader.join(5)
+    assert leader_result["value"] == (b'{"players":0}', 200)
+
+    # The pre-write body never replaced the fresh one
+    assert cache.backend.get("k") == b'{"players":1}'
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_query_started_before_invalidation_is_not_cached(cache):
+    load = SlowLoad({"players": 0})
+    leader, _ = _in_thread(lambda: cache.cached_json("k", 60, load))
+    assert load.started.wait(5)
+
+    cache.invalidate("k")
+    load.release.set()
+    leader.join(5)
+
+    assert cache.backend.get("k") is None
+
+
+def test_invalidate_court_evicts_court_and_shared_keys(cache):
+    for key in [cache.court_key(3), cache.court_key(4), cache.ACTIVE_SESSIONS_KEY] + cache.DASHBOARD_KEYS:
+        cache.backend.set(key, b"{}", 60)
+
+    cache.invalidate_court(3)
+
+    assert cache.backend.get(cache.court_key(3)) is None
+    assert cache.backend.get(cache.ACTIVE_SESSIONS_KEY) is None
+    assert all(cache.backend.get(key) is None for key in cache.DASHBOARD_KEYS)
+    assert cache.backend.get(cache.court_key(4)) == b"{}"
@@ -9,6 +9,7 @@ from flask import Flask, render_template, jsonify, send_from_directory, request
 from dotenv import load_dotenv
 import supabase
 import courtflow_backend
+import response_cache
 
 # Setup Flask
 app = Flask(__name__, static_folder='../')
@@ -53,6 +54,18 @@ def leaderboards():
 
 # ----- API ENDPOINTS -----
 
+# Serves a read endpoint from the shared response cache. load() returns the
+# payload; it only runs on a miss, once per key no matter how many viewers.
+# With the memory backend, check-ins handled by courtflow_backend.py can't
+# evict these entries (different process), so they're only bounded by their
+# TTL; set RESPONSE_CACHE_BACKEND=redis to share invalidations.
+def cached_api(key, ttl, load):
+    try:
+        body, status = response_cache.cached_json(key, ttl, lambda: (load(), 200))
+        return response_cache.json_response(body, status)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/login', methods=['POST'])
 def api_login():
     import authLogic
@@ -81,35 +94,23 @@ def api_logout():
 
 @app.route('/api/dashboard_stats')
 def get_dashboard_stats():
-    try:
-        data = courtflow_backend.get_dashboard_stats()
-        return jsonify(data)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return cached_api("dashboard:stats", response_cache.DASHBOARD_TTL,
+                      courtflow_backend.get_dashboard_stats)
 
 @app.route('/api/active_sessions')
 def get_active_sessions():
-    try:
-        data = courtflow_backend.get_active_sessions()
-        return jsonify(data)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return cached_api(response_cache.ACTIVE_SESSIONS_KEY, response_cache.ACTIVE_SESSIONS_TTL,
+                      courtflow_backend.get_active_sessions)
 
 @app.route('/api/utilization')
 def get_utilization():
-    try:
-        data = courtflow_backend.get_utilization_data()
-        return jsonify(data)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return cached_api("dashboard:utilization", response_cache.DASHBOARD_TTL,
+                      courtflow_backend.get_utilization_data)
 
 @app.route('/api/heatmap')
 def get_heatmap():
-    try:
-        data = courtflow_backend.get_heatmap_data()
-        return jsonify(data)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return cached_api("dashboard:heatmap", response_cache.DASHBOARD_TTL,
+                      courtflow_backend.get_heatmap_data)
 
 @app.route('/api/checkin', methods=['POST'])
 def api_checkin():
@@ -118,6 +119,7 @@ def api_checkin():
     court_id = data.get('court_id')
     try:
         res = courtflow_backend.check_in_player(qr_token, court_id)
+        response_cache.invalidate_court(court_id)
         return jsonify({"message": res})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -129,6 +131,7 @@ def api_checkout():
     try:
         res = courtflow_backend.check_out_player(user_id)
         if res.get("success"):
+            response_cache.invalidate_court(res.get("court_id"))
             return jsonify({"message": "Checked out successfully"})
         else:
             return jsonify({"error": res.get("message")}), 400
@@ -151,18 +154,26 @@ def api_join_team():
     
 @app.route('/api/leaderboard')
 def get_leaderboard():
+    return cached_api(response_cache.LEADERBOARD_KEY, response_cache.LEADERBOARD_TTL,
+                      load_leaderboard)
+
+def load_leaderboard():
     # SQL: Sum points per user, join with Profiles to get names
     response = supabase.table("Stats") \
         .select("user_id, Profiles(fname, lname), points.sum()") \
         .order("points.sum", desc=True) \
         .execute()
     
-    return jsonify(response.data)
+    return response.data
 
 
 if __name__ == '__main__':
     # Add dotenv loading from Model directory
     dotenv_path = os.path.join(os.path.dirname(__file__), '..', 'Model', '.env')
     load_dotenv(dotenv_path=dotenv_path)
-    
+
+    if not response_cache.backend.shared:
+        print("Response cache is per-process (memory): check-ins on the backend API "
+              "won't evict this app's cached entries until their TTL expires")
+
     app.run(debug=True, port=5000)
\ No newline at end of file
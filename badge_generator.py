@@ -0,0 +1,412 @@
+"""
+Bulk QR badge generator
+
+Builds a personalized check-in badge for every row in Profiles (encoding the
+player's raw qr_code_token, which staff scan into /api/checkin as qr_token)
+plus a QR poster for every court (linking to the Dashboard with that court
+preselected), and packs them into a ZIP of PNGs or a print-ready PDF sheet.
+
+- Profiles are streamed from Postgres in pages (keyset pagination)
+- QR codes are rendered in parallel across a process pool
+- badges/manifest.json stores a content hash per badge, so unchanged
+  badges are not re-rendered on the next run
+
+Usage:
+    python badge_generator.py                     # ZIP of all badges + posters
+    python badge_generator.py --format pdf        # print-ready PDF sheets
+    python badge_generator.py --benchmark 50000   # fake profiles, no DB needed
+
+Reads the same DB_* settings as the backend from Model/.env.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw, ImageFont
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+import psycopg2
+import psycopg2.extras
+import qrcode  # type: ignore
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Model"))
+from db_config import DB_CONFIG
+
+
+# Site court posters link to; Dashboard/index.html preselects ?court_id=
+BASE_URL = os.environ.get("BADGE_BASE_URL", "https://cuhackit-project.vercel.app")
+
+# Bump whenever the badge layout changes so every badge is re-rendered
+LAYOUT_VERSION = 2
+
+PAGE_SIZE = 1000
+DPI = 150
+
+# Badge: 2.5in x 3in. PDF sheet: US Letter, 3 x 3 badges.
+BADGE_SIZE = (375, 450)
+SHEET_SIZE = (int(8.5 * DPI), 11 * DPI)
+SHEET_COLUMNS = 3
+SHEET_ROWS = 3
+
+
+# =====================================================
+# BADGE SPECS
+# =====================================================
+# A spec is everything that ends up on the badge; its hash decides whether
+# an existing PNG can be reused.
+def player_spec(profile):
+    name = " ".join(part for part in (profile["fname"], profile["lname"]) if part)
+    return {
+        "filename": f"players/player_{profile['id']}.png",
+        "data": str(profile["qr_code_token"]),
+        "title": name,
+        "subtitle": "Scan to check in",
+    }
+
+
+def court_spec(court):
+    return {
+        "filename": f"courts/court_{court['id']}.png",
+        "data": f"{BASE_URL}/Dashboard/index.html?court_id={court['id']}",
+        "title": court["name"],
+        "subtitle": "Scan to check in to this court",
+    }
+
+
+def spec_hash(spec):
+    content = json.dumps([LAYOUT_VERSION, spec], sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+# =====================================================
+# DB STREAMING
+# =====================================================
+# Keyset pagination on id: each page is an index range scan, no OFFSET.
+def stream_profiles(conn, page_size=PAGE_SIZE):
+    cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    last_id = 0
+
+    try:
+        while True:
+            cursor.execute("""
+                SELECT id, fname, lname, qr_code_token
+                FROM "Profiles"
+                WHERE id > %s
+                AND qr_code_token IS NOT NULL
+                ORDER BY id
+                LIMIT %s;
+            """, (last_id, page_size))
+            rows = cursor.fetchall()
+
+            if not rows:
+                return
+
+            yield [dict(row) for row in rows]
+            last_id = rows[-1]["id"]
+
+    finally:
+        cursor.close()
+
+
+# Players stream_profiles() leaves out because they have nothing to encode
+def count_profiles_without_token(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT COUNT(*) FROM "Profiles" WHERE qr_code_token IS NULL;
+        """)
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def load_courts(conn):
+    cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    try:
+        cursor.execute("""
+            SELECT id, name FROM "Courts" ORDER BY id;
+        """)
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+# Fake profiles for --benchmark, paged like stream_profiles()
+def fake_profiles(count, page_size=PAGE_SIZE):
+    for start in range(1, count + 1, page_size):
+        yield [
+            {"id": i, "fname": "Player", "lname": str(i), "qr_code_token": 10_000_000 + i}
+            for i in range(start, min(start + page_size, count + 1))
+        ]
+
+
+# =====================================================
+# RENDERING (RUNS IN WORKER PROCESSES)
+# =====================================================
+# Fonts are loaded once per worker process
+_fonts = {}
+
+def _font(size):
+    if size not in _fonts:
+        _fonts[size] = ImageFont.load_default(size=size)
+    return _fonts[size]
+
+
+def render_badge(spec):
+    # A fixed mask pattern skips qrcode's search over all 8 masks, which is
+    # most of the render time; any mask is valid for scanners.
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=2, mask_pattern=0)
+    qr.add_data(spec["data"])
+    qr.make(fit=True)
+
+    # Build the code straight from the module matrix instead of letting
+    # qrcode draw one rectangle per module
+    matrix = qr.get_matrix()
+    modules = len(matrix)
+    pixels = bytes(0 if cell else 255 for row in matrix for cell in row)
+    code = Image.frombytes("L", (modules, modules), pixels)
+
+    width, height = BADGE_SIZE
+    scale = min(width - 40, height - 120) // modules
+    side = modules * scale
+    code = code.resize((side, side), Image.NEAREST)
+
+    badge = Image.new("L", BADGE_SIZE, 255)
+    badge.paste(code, ((width - side) // 2, 20))
+
+    draw = ImageDraw.Draw(badge)
+    draw.rectangle([0, 0, width - 1, height - 1], outline=0)
+    draw.text((width // 2, side + 50), spec["title"], fill=0, font=_font(28), anchor="mm")
+    draw.text((width // 2, side + 85), spec["subtitle"], fill=0, font=_font(18), anchor="mm")
+
+    out = io.BytesIO()
+    badge.save(out, "PNG", optimize=False)
+    return spec["filename"], out.getvalue()
+
+
+# =====================================================
+# PIPELINE
+# =====================================================
+# Renders every changed badge under out_dir and returns
+# (filenames in order, rendered count, skipped count).
+def render_all(pages, out_dir, workers):
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    # Start from the old manifest so a partial run (--courts-only) keeps the
+    # hashes of badges it didn't look at
+    new_manifest = dict(manifest)
+    filenames = []
+    rendered = skipped = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for page in pages:
+            todo = []
+            for spec in page:
+                digest = spec_hash(spec)
+                new_manifest[spec["filename"]] = digest
+                filenames.append(spec["filename"])
+
+                path = os.path.join(out_dir, spec["filename"])
+                if manifest.get(spec["filename"]) == digest and os.path.exists(path):
+                    skipped += 1
+                else:
+                    todo.append(spec)
+
+            chunksize = max(1, len(todo) // (workers * 4))
+            for filename, png in pool.map(render_badge, todo, chunksize=chunksize):
+                path = os.path.join(out_dir, filename)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(png)
+                rendered += 1
+
+    with open(manifest_path, "w") as f:
+        json.dump(new_manifest, f)
+
+    return filenames, rendered, skipped
+
+
+# =====================================================
+# PACKAGING
+# =====================================================
+def write_zip(out_dir, filenames, zip_path):
+    # PNGs are already compressed, so just store them
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as archive:
+        for filename in filenames:
+            archive.write(os.path.join(out_dir, filename), filename)
+
+
+def _sheets(out_dir, filenames):
+    per_sheet = SHEET_COLUMNS * SHEET_ROWS
+    width, height = BADGE_SIZE
+    margin_x = (SHEET_SIZE[0] - SHEET_COLUMNS * width) // 2
+    margin_y = (SHEET_SIZE[1] - SHEET_ROWS * height) // 2
+
+    for start in range(0, len(filenames), per_sheet):
+        sheet = Image.new("L", SHEET_SIZE, 255)
+        for slot, filename in enumerate(filenames[start:start + per_sheet]):
+            row, column = divmod(slot, SHEET_COLUMNS)
+            with Image.open(os.path.join(out_dir, filename)) as badge:
+                sheet.paste(badge, (margin_x + column * width, margin_y + row * height))
+        yield sheet
+
+
+# Minimal streaming PDF writer: every sheet becomes one page holding a single
+# Flate-compressed grayscale image. Objects go straight to the file and only
+# their offsets are kept, so time and memory grow linearly with the number of
+# sheets. (Pillow's save(append=True) re-reads the whole PDF on every call.)
+class PdfWriter:
+
+    CATALOG = 1
+    PAGES = 2
+
+    def __init__(self, f):
+        self.f = f
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 3
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write_object(self, object_id, body, stream=None):
+        self.offsets[object_id] = self.f.tell()
+        self.f.write(f"{object_id} 0 obj\n{body}\n".encode("ascii"))
+        if stream is not None:
+            self.f.write(b"stream\n" + stream + b"\nendstream\n")
+        self.f.write(b"endobj\n")
+
+    def _new_object(self, body, stream=None):
+        object_id = self.next_id
+        self.next_id += 1
+        self._write_object(object_id, body, stream)
+        return object_id
+
+    def add_page(self, image):
+        width, height = image.size
+        data = zlib.compress(image.tobytes(), 6)
+        image_id = self._new_object(
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode "
+            f"/Length {len(data)} >>", data)
+
+        # Page size in points (1/72 in)
+        page_width = width * 72 / DPI
+        page_height = height * 72 / DPI
+        content = f"q {page_width:.2f} 0 0 {page_height:.2f} 0 0 cm /Im0 Do Q".encode("ascii")
+        content_id = self._new_object(f"<< /Length {len(content)} >>", content)
+
+        self.page_ids.append(self._new_object(
+            f"<< /Type /Page /Parent {self.PAGES} 0 R "
+            f"/MediaBox [0 0 {page_width:.2f} {page_height:.2f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> "
+            f"/Contents {content_id} 0 R >>"))
+
+    def close(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(self.PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>")
+        self._write_object(self.CATALOG, f"<< /Type /Catalog /Pages {self.PAGES} 0 R >>")
+
+        xref = self.f.tell()
+        self.f.write(f"xref\n0 {self.next_id}\n0000000000 65535 f \n".encode("ascii"))
+        for object_id in range(1, self.next_id):
+            self.f.write(f"{self.offsets[object_id]:010d} 00000 n \n".encode("ascii"))
+        self.f.write(f"trailer\n<< /Size {self.next_id} /Root {self.CATALOG} 0 R >>\n"
+                     f"startxref\n{xref}\n%%EOF\n".encode("ascii"))
+
+
+def write_pdf(out_dir, filenames, pdf_path):
+    with open(pdf_path, "wb") as f:
+        pdf = PdfWriter(f)
+        for sheet in _sheets(out_dir, filenames):
+            pdf.add_page(sheet)
+        pdf.close()
+
+
+def package(out_dir, filenames, fmt, output):
+    if fmt == "zip":
+        write_zip(out_dir, filenames, output)
+    else:
+        write_pdf(out_dir, filenames, output)
+
+
+# =====================================================
+# ENTRY POINTS
+# =====================================================
+def generate(args):
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        courts = [court_spec(c) for c in load_courts(conn)]
+        players = ([player_spec(p) for p in page] for page in stream_profiles(conn))
+        no_token = 0 if args.courts_only else count_profiles_without_token(conn)
+
+        pages = [courts] if args.courts_only else _chain([courts], players)
+
+        started = time.monotonic()
+        filenames, rendered, skipped = render_all(pages, args.out_dir, args.workers)
+    finally:
+        conn.close()
+
+    package(args.out_dir, filenames, args.format, args.output)
+    elapsed = time.monotonic() - started
+    print(f"Rendered {rendered}, reused {skipped} unchanged badges in {elapsed:.1f}s")
+    print(f"Saved {len(filenames)} badges to '{args.output}'")
+    if no_token:
+        print(f"Skipped {no_token} profiles with no qr_code_token (no badge to print)")
+
+
+def benchmark(args):
+    out_dir = tempfile.mkdtemp(prefix="badges_bench_")
+    try:
+        for label in ("cold", "unchanged"):
+            pages = ([player_spec(p) for p in page] for page in fake_profiles(args.benchmark))
+            started = time.monotonic()
+            filenames, rendered, skipped = render_all(pages, out_dir, args.workers)
+            elapsed = time.monotonic() - started
+            print(f"{label:>9}: {len(filenames)} badges in {elapsed:.1f}s "
+                  f"({len(filenames) / elapsed:.0f} badges/sec, {rendered} rendered, {skipped} reused)")
+
+        started = time.monotonic()
+        output = os.path.join(out_dir, f"badges.{args.format}")
+        package(out_dir, filenames, args.format, output)
+        elapsed = time.monotonic() - started
+        print(f"{args.format:>9}: packed in {elapsed:.1f}s ({os.path.getsize(output) / (1024 * 1024):.1f} MB)")
+    finally:
+        shutil.rmtree(out_dir)
+
+
+def _chain(*iterables):
+    for iterable in iterables:
+        yield from iterable
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate QR check-in badges and court posters")
+    parser.add_argument("--format", choices=["zip", "pdf"], default="zip")
+    parser.add_argument("--output", help="ZIP/PDF path (default: badges.<format>)")
+    parser.add_argument("--out-dir", default="badges", help="rendered PNGs + manifest.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--courts-only", action="store_true", help="only render court posters")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="time N fake profiles, no DB")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args)
+        return
+
+    args.output = args.output or f"badges.{args.format}"
+    os.makedirs(args.out_dir, exist_ok=True)
+    generate(args)
+
+
+if __name__ == "__main__":
+    main()